@@ -442,6 +442,23 @@ async def approve_anomaly(anomaly_id: int):
         logger.error(f"Error approving anomaly {anomaly_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/learned-apps")
+async def get_learned_apps(names: str = ""):
+    """Check which of a comma-separated list of applications have been learned as normal."""
+    try:
+        usual_apps = set(training_manager.get_user_profile().get('usual_applications', []))
+        requested = [name for name in names.split(',') if name]
+        
+        return {
+            "success": True,
+            "message": f"Checked {len(requested)} applications",
+            "data": {name: name in usual_apps for name in requested}
+        }
+        
+    except Exception as e:
+        logger.error(f"Error checking learned apps: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/api/learned-apps/{app_name}")
 async def remove_learned_app(app_name: str):
     """Remove an application from the learned normal apps list."""
@@ -20,10 +20,24 @@ class BehaviorDatabase:
         self._lock = threading.Lock()
         self._init_database()
         
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the shared performance pragmas applied."""
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            PRAGMA synchronous=NORMAL;
+            PRAGMA wal_autocheckpoint=1000;
+            PRAGMA busy_timeout=5000;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=134217728;
+        """)
+        return conn
+        
     def _init_database(self):
         """Initialize database tables if they don't exist."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
+            # WAL is persistent in the database file, so it only needs setting once
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS events (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -76,7 +90,7 @@ class BehaviorDatabase:
                   session_id: str = None, metadata: Dict = None) -> int:
         """Add a new event to the database."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             metadata_json = json.dumps(metadata) if metadata else None
@@ -93,10 +107,52 @@ class BehaviorDatabase:
             logging.info(f"Added event: {event_type}, app: {app_name}, id: {event_id}")
             return event_id
     
+    def new_connection(self) -> sqlite3.Connection:
+        """
+        Open a connection for a single thread to keep and reuse (e.g. a writer thread).
+        The caller owns it: it bypasses the shared lock and must be closed by the caller.
+        """
+        return self._connect()
+    
+    def add_events_bulk(self, rows: List[Tuple[str, Optional[str], Optional[str], Optional[Dict]]],
+                        conn: Optional[sqlite3.Connection] = None) -> int:
+        """
+        Add several events in a single transaction.
+        
+        Args:
+            rows: (event_type, app_name, session_id, metadata) tuples
+            conn: Caller-owned connection from new_connection(); a fresh one is used if omitted
+            
+        Returns:
+            Number of events added
+        """
+        if not rows:
+            return 0
+        
+        params = [(event_type, app_name, session_id, json.dumps(metadata) if metadata else None)
+                  for event_type, app_name, session_id, metadata in rows]
+        insert = """
+            INSERT INTO events (event_type, app_name, session_id, metadata)
+            VALUES (?, ?, ?, ?)
+        """
+        
+        if conn is not None:
+            with conn:  # Commits, or rolls back on error
+                conn.executemany(insert, params)
+        else:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(insert, params)
+                conn.commit()
+                conn.close()
+        
+        logging.info(f"Added {len(rows)} events")
+        return len(rows)
+    
     def get_recent_events(self, hours: int = 24, limit: int = 1000) -> List[Dict]:
         """Get recent events within specified hours."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cutoff_time = datetime.now() - timedelta(hours=hours)
@@ -129,7 +185,7 @@ class BehaviorDatabase:
     def get_unprocessed_events(self) -> List[Dict]:
         """Get events that haven't been processed by the ML model."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -162,7 +218,7 @@ class BehaviorDatabase:
             return
             
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             placeholders = ','.join('?' * len(event_ids))
@@ -179,7 +235,7 @@ class BehaviorDatabase:
                        change_reason: str = None, anomaly_data: Dict = None) -> int:
         """Add a new trust score entry."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             anomaly_json = json.dumps(anomaly_data) if anomaly_data else None
@@ -199,7 +255,7 @@ class BehaviorDatabase:
     def get_current_trust_score(self) -> Optional[int]:
         """Get the most recent trust score."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -217,7 +273,7 @@ class BehaviorDatabase:
                    description: str, metadata: Dict = None) -> int:
         """Add an anomaly detection result."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             metadata_json = json.dumps(metadata) if metadata else None
@@ -234,6 +290,42 @@ class BehaviorDatabase:
             logging.warning(f"Anomaly detected: {anomaly_type} (severity: {severity:.2f}) - {description}")
             return anomaly_id
     
+    def add_anomalies_bulk(self, rows: List[Tuple[int, str, float, str, Optional[Dict]]]) -> List[int]:
+        """
+        Add several anomaly detection results in a single transaction.
+        
+        Args:
+            rows: (event_id, anomaly_type, severity, description, metadata) tuples
+            
+        Returns:
+            Anomaly IDs in the same order as rows
+        """
+        if not rows:
+            return []
+        
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            # executemany() does not report lastrowid, so insert row by row
+            # inside one transaction and commit once
+            anomaly_ids = []
+            for event_id, anomaly_type, severity, description, metadata in rows:
+                cursor.execute("""
+                    INSERT INTO anomalies (event_id, anomaly_type, severity, description, metadata)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (event_id, anomaly_type, severity, description,
+                      json.dumps(metadata) if metadata else None))
+                anomaly_ids.append(cursor.lastrowid)
+            
+            conn.commit()
+            conn.close()
+        
+        for _, anomaly_type, severity, description, _ in rows:
+            logging.warning(f"Anomaly detected: {anomaly_type} (severity: {severity:.2f}) - {description}")
+        
+        return anomaly_ids
+    
 
     
     def get_events_since(self, timestamp: float) -> List[Dict[str, Any]]:
@@ -241,7 +333,7 @@ class BehaviorDatabase:
         cutoff_datetime = datetime.fromtimestamp(timestamp)
         
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -268,7 +360,7 @@ class BehaviorDatabase:
     def get_recent_anomalies(self, hours: int = 168) -> List[Dict]:  # Default 7 days instead of 24 hours
         """Get anomalies within specified hours."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cutoff_time = datetime.now() - timedelta(hours=hours)
@@ -389,7 +481,7 @@ class BehaviorDatabase:
     def get_live_activity(self, minutes: int = 30) -> Dict[str, Any]:
         """Get live system activity for dashboard display."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cutoff_time = datetime.now() - timedelta(minutes=minutes)
@@ -506,7 +598,7 @@ class BehaviorDatabase:
     def get_learned_patterns(self) -> Dict[str, Any]:
         """Get what the system has learned as normal behavioral patterns."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             patterns = {
@@ -628,7 +720,7 @@ class BehaviorDatabase:
     def get_trust_history(self, hours: int = 24) -> List[Dict]:
         """Get trust score history within specified hours."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cutoff_time = datetime.now() - timedelta(hours=hours)
@@ -656,11 +748,50 @@ class BehaviorDatabase:
             
             return history
     
+    def get_trust_history_since(self, after_id: int, hours: int = 24) -> List[Dict]:
+        """
+        Get trust score entries newer than a known row, within specified hours.
+        
+        Args:
+            after_id: Only return rows with a larger ID (0 for the full window)
+            hours: Maximum age of returned rows
+            
+        Returns:
+            Trust history entries in insertion order, each including its row ID
+        """
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            cutoff_time = datetime.now() - timedelta(hours=hours)
+            
+            cursor.execute("""
+                SELECT id, timestamp, score, previous_score, change_reason, anomaly_data
+                FROM trust_scores 
+                WHERE id > ? AND timestamp > ? 
+                ORDER BY id ASC
+            """, (after_id, cutoff_time.isoformat()))
+            
+            rows = cursor.fetchall()
+            conn.close()
+            
+            return [
+                {
+                    'id': row[0],
+                    'timestamp': row[1],
+                    'score': row[2],
+                    'previous_score': row[3],
+                    'change_reason': row[4],
+                    'anomaly_data': json.loads(row[5]) if row[5] else {}
+                }
+                for row in rows
+            ]
+    
     def approve_anomaly(self, anomaly_id: int, approved_by: str = "admin") -> bool:
         """Mark an anomaly as approved/normal."""
         try:
             with self._lock:
-                conn = sqlite3.connect(self.db_path)
+                conn = self._connect()
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -683,7 +814,7 @@ class BehaviorDatabase:
         """Get anomaly details by ID."""
         try:
             with self._lock:
-                conn = sqlite3.connect(self.db_path)
+                conn = self._connect()
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -722,25 +853,30 @@ class BehaviorDatabase:
     def cleanup_old_data(self, keep_days: int = 30):
         """Remove old data to prevent database from growing too large."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            cutoff_time = datetime.now() - timedelta(days=keep_days)
-            
-            # Delete old events
-            cursor.execute("DELETE FROM events WHERE timestamp < ?", (cutoff_time.isoformat(),))
-            
-            # Delete old trust scores (keep more history for analysis)
-            old_cutoff = datetime.now() - timedelta(days=keep_days * 2)
-            cursor.execute("DELETE FROM trust_scores WHERE timestamp < ?", (old_cutoff.isoformat(),))
-            
-            # Delete old anomalies
-            cursor.execute("DELETE FROM anomalies WHERE timestamp < ?", (cutoff_time.isoformat(),))
-            
-            # Vacuum database to reclaim space
-            cursor.execute("VACUUM")
-            
+            now = datetime.now()
+            cutoff_iso = (now - timedelta(days=keep_days)).isoformat()
+            # Keep more trust score history for analysis
+            old_cutoff_iso = (now - timedelta(days=keep_days * 2)).isoformat()
+
+            targets = [
+                ('events', cutoff_iso),
+                ('anomalies', cutoff_iso),
+                ('trust_scores', old_cutoff_iso)
+            ]
+
+            # All deletes run in one transaction
+            deleted = {}
+            for table, cutoff in targets:
+                cursor.execute(f"DELETE FROM {table} WHERE timestamp < ?", (cutoff,))
+                deleted[table] = cursor.rowcount
+
             conn.commit()
+
+            # Vacuum database to reclaim space (must run outside a transaction)
+            cursor.execute("VACUUM")
             conn.close()
-            
-            logging.info(f"Cleaned up data older than {keep_days} days")
+
+            logging.info(f"Cleaned up data older than {keep_days} days: {deleted}")
@@ -6,11 +6,16 @@ Manages the learning phases and user behavior baseline establishment
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Set, Any
 from pathlib import Path
 
 from .database import BehaviorDatabase
 
+try:
+    import orjson
+except ImportError:  # Fall back to stdlib json
+    orjson = None
+
 class TrainingManager:
     """
     Manages the training phases of the ZTA system.
@@ -33,14 +38,21 @@ class TrainingManager:
         # Load or create training configuration
         self.config = self._load_or_create_config()
         
+        # Trigram index over learned applications for partial matching
+        self._rebuild_app_index()
+        
         logging.info(f"Training manager initialized. Current phase: {self.get_current_phase()}")
     
     def _load_or_create_config(self) -> Dict[str, Any]:
         """Load existing training config or create new one."""
         if self.config_path.exists():
             try:
-                with open(self.config_path, 'r') as f:
-                    config = json.load(f)
+                if orjson is not None:
+                    with open(self.config_path, 'rb') as f:
+                        config = orjson.loads(f.read())
+                else:
+                    with open(self.config_path, 'r') as f:
+                        config = json.load(f)
                 # Validate config structure
                 required_keys = ['training_start', 'phase', 'user_profile']
                 if all(key in config for key in required_keys):
@@ -73,11 +85,51 @@ class TrainingManager:
     def _save_config(self, config: Dict[str, Any]) -> None:
         """Save training configuration to file."""
         try:
-            with open(self.config_path, 'w') as f:
-                json.dump(config, f, indent=2, default=str)
+            if orjson is not None:
+                # Compact output: this runs for every processed training event
+                with open(self.config_path, 'wb') as f:
+                    f.write(orjson.dumps(config, default=str))
+            else:
+                with open(self.config_path, 'w') as f:
+                    json.dump(config, f, default=str)
         except Exception as e:
             logging.error(f"Failed to save training config: {e}")
     
+    @staticmethod
+    def _trigrams(name: str) -> Set[str]:
+        """Get the set of 3-character windows of a lowercase name."""
+        return {name[i:i + 3] for i in range(len(name) - 2)}
+    
+    def _rebuild_app_index(self) -> None:
+        """Rebuild the application lookup index from the user profile."""
+        self._app_trigrams: Dict[str, Set[str]] = {}
+        self._trigram_index: Dict[str, Set[str]] = {}
+        self._short_apps: Set[str] = set()
+        
+        for app_name in self.config['user_profile']['usual_applications']:
+            self._index_app(app_name)
+    
+    def _index_app(self, app_name: str) -> None:
+        """Add a learned application to the lookup index."""
+        app_lower = app_name.lower()
+        trigrams = self._trigrams(app_lower)
+        self._app_trigrams[app_name] = trigrams
+        
+        # Names too short for trigrams are always partial-match candidates
+        if not trigrams:
+            self._short_apps.add(app_lower)
+        for trigram in trigrams:
+            self._trigram_index.setdefault(trigram, set()).add(app_lower)
+    
+    def _learn_app(self, app_name: str) -> bool:
+        """Append an application to the usual applications if it is new."""
+        if app_name in self._app_trigrams:
+            return False
+        
+        self.config['user_profile']['usual_applications'].append(app_name)
+        self._index_app(app_name)
+        return True
+    
     def get_current_phase(self) -> str:
         """Get current training phase."""
         training_start = datetime.fromisoformat(self.config['training_start'])
@@ -129,8 +181,7 @@ class TrainingManager:
         
         # Learn usual applications
         if event_type == 'app_launch' and app_name:
-            if app_name not in user_profile['usual_applications']:
-                user_profile['usual_applications'].append(app_name)
+            self._learn_app(app_name)
         
         # Learn usual work hours
         hour = timestamp.hour
@@ -191,16 +242,24 @@ class TrainingManager:
         if not app_name:
             return False
             
-        usual_apps = self.config['user_profile']['usual_applications']
-        
         # Direct match
-        if app_name in usual_apps:
+        if app_name in self._app_trigrams:
             return True
             
-        # Partial match for similar apps
+        # Partial match for similar apps: any substring relation between two
+        # names of 3+ characters implies they share at least one trigram
         app_lower = app_name.lower()
-        for usual_app in usual_apps:
-            if usual_app.lower() in app_lower or app_lower in usual_app.lower():
+        query_trigrams = self._trigrams(app_lower)
+        if not query_trigrams:
+            candidates = {name for names in self._trigram_index.values() for name in names}
+        else:
+            candidates = set()
+            for trigram in query_trigrams:
+                candidates.update(self._trigram_index.get(trigram, ()))
+        candidates.update(self._short_apps)
+        
+        for usual_lower in candidates:
+            if usual_lower in app_lower or app_lower in usual_lower:
                 return True
         
         return False
@@ -278,10 +337,11 @@ class TrainingManager:
             self.db.approve_anomaly(anomaly_id)
             
             # Extract learning data from anomaly
+            changed = False
             if anomaly.get('anomaly_type') == 'unknown_application':
                 app_name = anomaly.get('metadata', {}).get('app_name')
-                if app_name and app_name not in self.config['user_profile']['usual_applications']:
-                    self.config['user_profile']['usual_applications'].append(app_name)
+                if app_name and self._learn_app(app_name):
+                    changed = True
                     logging.info(f"Added {app_name} to usual applications")
             
             elif anomaly.get('anomaly_type') == 'unusual_time':
@@ -289,8 +349,9 @@ class TrainingManager:
                 # Implementation depends on specific time pattern
                 pass
             
-            # Save updated profile
-            self._save_config(self.config)
+            # Save updated profile only if something was learned
+            if changed:
+                self._save_config(self.config)
             return True
             
         except Exception as e:
@@ -317,6 +378,7 @@ class TrainingManager:
             }
         }
         
+        self._rebuild_app_index()
         self._save_config(self.config)
         logging.info("Training reset complete. Starting fresh training period.")
     
@@ -326,6 +388,7 @@ class TrainingManager:
             usual_apps = self.config['user_profile']['usual_applications']
             if app_name in usual_apps:
                 usual_apps.remove(app_name)
+                self._rebuild_app_index()
                 self._save_config(self.config)
                 logging.info(f"Removed {app_name} from learned applications")
                 return True
@@ -337,9 +400,7 @@ class TrainingManager:
     def add_learned_app(self, app_name: str) -> bool:
         """Add an application to learned normal apps."""
         try:
-            usual_apps = self.config['user_profile']['usual_applications']
-            if app_name not in usual_apps:
-                usual_apps.append(app_name)
+            if self._learn_app(app_name):
                 self._save_config(self.config)
                 logging.info(f"Added {app_name} to learned applications")
             return True
@@ -48,6 +48,11 @@ class TrustScorer:
         # Get or create current score
         self.current_score = self._get_or_create_initial_score()
         
+        # Running 24h session aggregates: seeded from the database, then kept up to
+        # date per score change and re-seeded hourly so old entries age out
+        self.session_reseed_interval = timedelta(hours=1)
+        self._seed_session_stats()
+        
         logging.info(f"Trust scorer initialized with score: {self.current_score}")
         
     def _get_or_create_initial_score(self) -> float:
@@ -65,6 +70,25 @@ class TrustScorer:
             
         return float(current)
         
+    def _seed_session_stats(self) -> None:
+        """Load the 24h session aggregates from the database."""
+        history = self.db.get_trust_history(hours=24)
+        self._session_min = min([h.get('score', self.current_score) for h in history]) if history else self.current_score
+        self._score_change_count = len(history)
+        self._anomaly_count = len(self.db.get_recent_anomalies(hours=24))
+        self._session_seeded_at = datetime.now()
+        
+    def _update_session_stats(self, anomaly_count: int = 0) -> None:
+        """Update running session aggregates after a score change."""
+        if datetime.now() - self._session_seeded_at >= self.session_reseed_interval:
+            # The new score change is already stored, so the fresh counts include it
+            self._seed_session_stats()
+            return
+            
+        self._session_min = min(self._session_min, self.current_score)
+        self._score_change_count += 1
+        self._anomaly_count += anomaly_count
+        
     def get_trust_level(self, score: Optional[float] = None) -> str:
         """Get trust level category based on score."""
         if score is None:
@@ -132,6 +156,7 @@ class TrustScorer:
             previous_score=previous_score,
             change_reason=change_reason
         )
+        self._update_session_stats()
         
         return self._create_update_summary(previous_score, change_reason)
         
@@ -184,6 +209,7 @@ class TrustScorer:
             change_reason=change_reason,
             anomaly_data={'anomalies': anomaly_details, 'total_deduction': total_deduction}
         )
+        self._update_session_stats(len(anomalies))
         
         # Log security alert if score drops to dangerous levels
         if self.current_score < self.low_trust_threshold:
@@ -282,19 +308,31 @@ class TrustScorer:
             previous_score=previous_score,
             change_reason=change_reason
         )
+        self._update_session_stats()
         
         return self._create_update_summary(previous_score, change_reason)
         
-    def get_session_summary(self) -> Dict[str, Any]:
-        """Get comprehensive session trust summary."""
-        history = self.db.get_trust_history(hours=24)
-        recent_anomalies = self.db.get_recent_anomalies(hours=24)
+    def get_session_summary(self, include_history: bool = False) -> Dict[str, Any]:
+        """
+        Get comprehensive session trust summary.
         
-        return {
+        Args:
+            include_history: Also load the last 10 score changes from the database
+            
+        Returns:
+            Session summary built from running aggregates
+        """
+        summary = {
             'current_status': self.get_trust_status(),
             'session_start_score': self.initial_score,
-            'score_changes': len(history),
-            'anomaly_count': len(recent_anomalies),
-            'lowest_score_24h': min([h.get('score', self.current_score) for h in history]) if history else self.current_score,
-            'trust_history': history[-10:] if history else []  # Last 10 changes
+            'score_changes': self._score_change_count,
+            'anomaly_count': self._anomaly_count,
+            'lowest_score_24h': self._session_min,
+            'trust_history': []
         }
+        
+        if include_history:
+            history = self.db.get_trust_history(hours=24)
+            summary['trust_history'] = history[-10:]  # Last 10 changes
+            
+        return summary
@@ -3,24 +3,154 @@ Dynamic trust scoring system for behavioral monitoring.
 Manages trust scores based on anomaly detection results.
 """
 
+import time
+import math
 import logging
 import numpy as np
+from bisect import bisect_right
+from collections import deque
+from itertools import repeat
+from operator import itemgetter
 from datetime import datetime, timedelta
+from types import MappingProxyType
 from typing import Dict, List, Optional, Tuple, Any
 
 from .database import BehaviorDatabase
 
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:  # Numba is optional; the NumPy batch path is used instead
+    _NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# Enhanced type-specific modifiers for security threats
+_TYPE_MODIFIERS = MappingProxyType({
+    # CRITICAL THREATS (highest penalties)
+    'malicious_tool_usage': 2.5,           # Malware/hacking tools
+    'data_exfiltration_risk': 2.3,         # High bandwidth + suspicious patterns
+    'attack_pattern_detected': 2.2,        # Multiple attack tools used together
+    'malicious_port_access': 2.0,          # Direct attack vector access
+    'suspicious_late_activity': 1.9,       # Security tools at odd hours
+    
+    # HIGH RISK THREATS  
+    'network_scanning': 1.8,               # Network reconnaissance
+    'connection_flooding': 1.7,            # Network flooding attacks
+    'suspicious_ip_connection': 1.6,       # Connections to bad IPs
+    'privilege_escalation': 1.6,           # Admin tool usage
+    'attack_preparation': 1.5,             # Multiple security tools
+    'security_tool_usage': 1.5,            # Single security tool usage
+    
+    # MEDIUM RISK PATTERNS
+    'network_flooding': 1.4,               # General network flooding
+    'bandwidth_anomaly': 1.3,              # High bandwidth usage
+    'suspicious_port_access': 1.3,         # Suspicious port connections
+    'network_tool_usage': 1.3,             # Network utility usage
+    'app_abuse_pattern': 1.2,              # App launch flooding
+    'system_flooding': 1.2,                # System request flooding
+    'behavioral_flooding': 1.2,            # General flooding behavior
+    
+    # LOWER RISK ANOMALIES  
+    'unknown_application': 1.1,            # New apps (slightly concerning)
+    'rare_application': 1.0,               # Rare apps (normal penalty)
+    'unusual_time': 1.0,                   # Time anomalies
+    'rapid_switching': 0.9,                # App switching patterns
+    'risk_escalation': 0.9,                # Risk level increases
+    'critical_system_load': 0.8,           # System performance
+    'high_system_load': 0.7,               # System performance
+    'unusual_schedule': 0.7,               # Schedule anomalies
+    'rapid_activity': 0.6,                 # Rapid user activity
+    'suspicious_work_pattern': 0.6,        # Work pattern changes
+    'behavioral_anomaly': 0.5              # General behavioral anomalies
+})
+
+# Anomaly types that get an extra penalty at very high severity
+_CRITICAL_PENALTY_TYPES = frozenset({
+    'malicious_tool_usage', 'data_exfiltration_risk', 'attack_pattern_detected'
+})
+
+# Security-related anomaly types with a higher minimum penalty
+_SECURITY_TYPES = frozenset({
+    'malicious_tool_usage', 'attack_pattern_detected', 'suspicious_ip_connection',
+    'malicious_port_access', 'data_exfiltration_risk', 'network_scanning',
+    'privilege_escalation', 'security_tool_usage'
+})
+
+_RISK_MULTIPLIERS = MappingProxyType({'low': 0.8, 'medium': 1.0, 'high': 1.3, 'critical': 1.6})
+
+# Threat types that trigger alerts regardless of score drop
+_CRITICAL_THREATS = frozenset({
+    'malicious_tool_usage', 'data_exfiltration_risk', 'attack_pattern_detected',
+    'malicious_port_access', 'network_scanning', 'connection_flooding'
+})
+
+_HIGH_THREATS = frozenset({
+    'suspicious_ip_connection', 'privilege_escalation', 'attack_preparation',
+    'security_tool_usage', 'suspicious_late_activity'
+})
+
+# Field accessors for map() over anomaly and history dicts
+_get_severity = itemgetter('severity')
+_get_anomaly_type = itemgetter('anomaly_type')
+_get_score = itemgetter('score')
+
+# Anomaly types interned to small integer IDs (0 is reserved for unknown types)
+_UNKNOWN_TYPE_ID = 0
+_TYPE_ID = MappingProxyType({
+    t: i for i, t in enumerate(
+        sorted(set(_TYPE_MODIFIERS) | _CRITICAL_PENALTY_TYPES | _SECURITY_TYPES), start=1)
+})
+
+# Per-type lookup arrays indexed by type ID
+_MOD_ARR = np.ones(len(_TYPE_ID) + 1)
+_IS_CRITICAL_PENALTY = np.zeros(len(_TYPE_ID) + 1, dtype=bool)
+_IS_SECURITY = np.zeros(len(_TYPE_ID) + 1, dtype=bool)
+for _type, _tid in _TYPE_ID.items():
+    _MOD_ARR[_tid] = _TYPE_MODIFIERS.get(_type, 1.0)
+    _IS_CRITICAL_PENALTY[_tid] = _type in _CRITICAL_PENALTY_TYPES
+    _IS_SECURITY[_tid] = _type in _SECURITY_TYPES
+del _type, _tid
+
+@njit(cache=True)
+def _penalty_kernel(severity, modifiers, is_critical, is_security, meta_mult,
+                    thresholds, base_penalties):
+    """Compiled per-anomaly penalty loop; mirrors the NumPy rules in TrustScorer._calculate_penalties."""
+    n = severity.shape[0]
+    out = np.empty(n, dtype=np.int64)
+    
+    for i in range(n):
+        # Base penalty: highest threshold not above severity (thresholds ascending)
+        base = 0.0
+        for j in range(thresholds.shape[0]):
+            if severity[i] >= thresholds[j]:
+                base = base_penalties[j]
+        
+        penalty = np.floor(base * modifiers[i])
+        if is_critical[i] and severity[i] > 0.9:
+            penalty = np.floor(penalty * 1.5)
+        for j in range(meta_mult.shape[1]):
+            penalty = np.floor(penalty * meta_mult[i, j])
+        
+        minimum = 3.0 if is_security[i] else 1.0
+        out[i] = int(max(penalty, minimum))
+    
+    return out
+
 class TrustScorer:
     """Dynamic trust scoring system that adjusts based on behavioral anomalies."""
     
+    # Trust score range
+    min_score = 0
+    max_score = 100
+    
     def __init__(self, db: BehaviorDatabase, initial_score: int = 100):
         self.db = db
         self.initial_score = initial_score
         
-        # Trust score parameters
-        self.min_score = 0
-        self.max_score = 100
-        
         # Enhanced scoring rules with network and security focus
         self.severity_penalties = {
             0.95: 30,  # Critical severity (malware, data exfiltration)
@@ -33,6 +163,18 @@ class TrustScorer:
             0.05: 1    # Very low severity (barely unusual)
         }
         
+        # Ascending thresholds with parallel penalties for bisect lookup
+        self._sev_thresholds = tuple(sorted(self.severity_penalties))
+        self._sev_penalties = tuple(self.severity_penalties[t] for t in self._sev_thresholds)
+        
+        # Array form of the severity table for batch penalty calculation
+        self._sev_threshold_arr = np.array(self._sev_thresholds)
+        self._sev_penalty_arr = np.array(self._sev_penalties, dtype=np.float64)
+        
+        # Compile the penalty kernel up front rather than on the first anomaly batch
+        if _NUMBA_AVAILABLE:
+            self._calculate_penalties([{'severity': 0.5, 'anomaly_type': 'behavioral_anomaly'}])
+        
         # Recovery parameters (slightly reduced for security focus)
         self.recovery_rate = 0.8  # Slower recovery for security incidents
         self.max_recovery_per_cycle = 3  # Reduced maximum recovery
@@ -44,6 +186,31 @@ class TrustScorer:
             'info': 80       # Info alert
         }
         
+        # Alert levels ordered by ascending threshold, for bucket lookup
+        self._alert_levels = tuple(sorted(self.alert_thresholds, key=self.alert_thresholds.get))
+        self._alert_thresh = tuple(self.alert_thresholds[level] for level in self._alert_levels)
+        
+        # Risk level per whole score (index 0..max_score); see _get_risk_level
+        crit = self.alert_thresholds['critical']
+        warn = self.alert_thresholds['warning']
+        info = self.alert_thresholds['info']
+        self._risk_table = (('HIGH',) * (crit + 1) + ('MEDIUM',) * (warn - crit) +
+                            ('LOW',) * (info - warn) + ('MINIMAL',) * (self.max_score - info))
+        
+        # Monotonic times of anomaly batches seen in the last hour. Anomalies
+        # logged before startup are only known to the DB, so it is consulted
+        # until it reports none in the last hour.
+        self._recent_anomaly_times = deque()
+        self._check_db_anomalies = True
+        
+        # Sliding 24h trust history window, refreshed incrementally by row ID
+        self._history_cache = deque()
+        self._history_cache_id = 0
+        
+        # Cached ISO timestamp for result dicts (refreshed once per second)
+        self._last_ts_sec = 0
+        self._last_ts_str = ''
+        
         # Initialize current score
         self.current_score = self._get_or_create_initial_score()
         
@@ -63,6 +230,14 @@ class TrustScorer:
         
         return current
     
+    def _now_iso(self) -> str:
+        """Get the current time as an ISO string, cached at second granularity."""
+        now_sec = int(time.time())
+        if now_sec != self._last_ts_sec:
+            self._last_ts_sec = now_sec
+            self._last_ts_str = datetime.fromtimestamp(now_sec).isoformat()
+        return self._last_ts_str
+    
     def process_anomalies(self, anomalies: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Process detected anomalies and update trust score accordingly.
@@ -77,32 +252,40 @@ class TrustScorer:
             return self._process_normal_behavior()
         
         previous_score = self.current_score
-        total_penalty = 0
+        self._recent_anomaly_times.append(time.monotonic())
+        penalties = self._calculate_penalties(anomalies)
+        total_penalty = int(penalties.sum())
         anomaly_details = []
-        
-        for anomaly in anomalies:
-            penalty = self._calculate_penalty(anomaly)
-            total_penalty += penalty
+        anomaly_types = []
+        rows = []
+        max_severity = anomalies[0]['severity']
+        
+        # Single pass: collect DB rows, types, max severity and result details
+        for anomaly, penalty in zip(anomalies, penalties.tolist()):
+            anomaly_type = anomaly['anomaly_type']
+            severity = anomaly['severity']
+            description = anomaly['description']
             
-            # Log the anomaly in database
-            anomaly_id = self.db.add_anomaly(
-                event_id=anomaly['event_id'],
-                anomaly_type=anomaly['anomaly_type'],
-                severity=anomaly['severity'],
-                description=anomaly['description'],
-                metadata=anomaly.get('metadata', {})
-            )
+            anomaly_types.append(anomaly_type)
+            rows.append((anomaly['event_id'], anomaly_type, severity, description,
+                         anomaly.get('metadata', {})))
+            if severity > max_severity:
+                max_severity = severity
             
             anomaly_details.append({
-                'anomaly_id': anomaly_id,
-                'type': anomaly['anomaly_type'],
-                'severity': anomaly['severity'],
+                'anomaly_id': None,
+                'type': anomaly_type,
+                'severity': severity,
                 'penalty': penalty,
-                'description': anomaly['description']
+                'description': description
             })
             
-            logging.warning(f"Applied penalty of {penalty} points for {anomaly['anomaly_type']} "
-                          f"(severity: {anomaly['severity']:.2f})")
+            logging.warning(f"Applied penalty of {penalty} points for {anomaly_type} "
+                          f"(severity: {severity:.2f})")
+        
+        # Log the anomalies in database (one transaction for the batch)
+        for detail, anomaly_id in zip(anomaly_details, self.db.add_anomalies_bulk(rows)):
+            detail['anomaly_id'] = anomaly_id
         
         # Apply total penalty
         new_score = max(self.min_score, self.current_score - total_penalty)
@@ -115,16 +298,15 @@ class TrustScorer:
             anomaly_data={
                 'anomaly_count': len(anomalies),
                 'total_penalty': total_penalty,
-                'anomaly_types': [a['anomaly_type'] for a in anomalies],
-                'max_severity': max(a['severity'] for a in anomalies)
+                'anomaly_types': anomaly_types,
+                'max_severity': max_severity
             }
         )
         
         self.current_score = new_score
         
         # Check for alerts (enhanced with threat types)
-        alert_level = self._check_alert_level(new_score, previous_score, 
-                                            [a['anomaly_type'] for a in anomalies])
+        alert_level = self._check_alert_level(new_score, previous_score, anomaly_types)
         
         result = {
             'previous_score': previous_score,
@@ -134,7 +316,7 @@ class TrustScorer:
             'total_penalty': total_penalty,
             'anomaly_details': anomaly_details,
             'alert_level': alert_level,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self._now_iso()
         }
         
         if alert_level:
@@ -148,9 +330,7 @@ class TrustScorer:
         previous_score = self.current_score
         
         # Check time since last anomaly
-        recent_anomalies = self.db.get_recent_anomalies(hours=1)
-        
-        if not recent_anomalies and self.current_score < self.max_score:
+        if not self._has_recent_anomalies() and self.current_score < self.max_score:
             # No recent anomalies, allow some recovery
             recovery_points = min(
                 self.max_recovery_per_cycle,
@@ -177,7 +357,7 @@ class TrustScorer:
                     'new_score': new_score,
                     'score_change': recovery_points,
                     'recovery_points': recovery_points,
-                    'timestamp': datetime.now().isoformat(),
+                    'timestamp': self._now_iso(),
                     'reason': 'normal_behavior_recovery'
                 }
         
@@ -186,110 +366,104 @@ class TrustScorer:
             'previous_score': previous_score,
             'new_score': self.current_score,
             'score_change': 0,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self._now_iso(),
             'reason': 'no_change'
         }
     
-    def _calculate_penalty(self, anomaly: Dict[str, Any]) -> int:
-        """Enhanced penalty calculation for network and security anomalies."""
-        severity = anomaly['severity']
-        anomaly_type = anomaly['anomaly_type']
-        
-        # Base penalty based on severity
-        base_penalty = 0
-        for threshold, penalty in sorted(self.severity_penalties.items(), reverse=True):
-            if severity >= threshold:
-                base_penalty = penalty
-                break
-        
-        # Enhanced type-specific modifiers for security threats
-        type_modifiers = {
-            # CRITICAL THREATS (highest penalties)
-            'malicious_tool_usage': 2.5,           # Malware/hacking tools
-            'data_exfiltration_risk': 2.3,         # High bandwidth + suspicious patterns
-            'attack_pattern_detected': 2.2,        # Multiple attack tools used together
-            'malicious_port_access': 2.0,          # Direct attack vector access
-            'suspicious_late_activity': 1.9,       # Security tools at odd hours
-            
-            # HIGH RISK THREATS  
-            'network_scanning': 1.8,               # Network reconnaissance
-            'connection_flooding': 1.7,            # Network flooding attacks
-            'suspicious_ip_connection': 1.6,       # Connections to bad IPs
-            'privilege_escalation': 1.6,           # Admin tool usage
-            'attack_preparation': 1.5,             # Multiple security tools
-            'security_tool_usage': 1.5,            # Single security tool usage
-            
-            # MEDIUM RISK PATTERNS
-            'network_flooding': 1.4,               # General network flooding
-            'bandwidth_anomaly': 1.3,              # High bandwidth usage
-            'suspicious_port_access': 1.3,         # Suspicious port connections
-            'network_tool_usage': 1.3,             # Network utility usage
-            'app_abuse_pattern': 1.2,              # App launch flooding
-            'system_flooding': 1.2,                # System request flooding
-            'behavioral_flooding': 1.2,            # General flooding behavior
-            
-            # LOWER RISK ANOMALIES  
-            'unknown_application': 1.1,            # New apps (slightly concerning)
-            'rare_application': 1.0,               # Rare apps (normal penalty)
-            'unusual_time': 1.0,                   # Time anomalies
-            'rapid_switching': 0.9,                # App switching patterns
-            'risk_escalation': 0.9,                # Risk level increases
-            'critical_system_load': 0.8,           # System performance
-            'high_system_load': 0.7,               # System performance
-            'unusual_schedule': 0.7,               # Schedule anomalies
-            'rapid_activity': 0.6,                 # Rapid user activity
-            'suspicious_work_pattern': 0.6,        # Work pattern changes
-            'behavioral_anomaly': 0.5              # General behavioral anomalies
-        }
-        
-        modifier = type_modifiers.get(anomaly_type, 1.0)
-        penalty = int(base_penalty * modifier)
-        
-        # Additional severity-based multipliers for critical anomalies
-        if anomaly_type in ['malicious_tool_usage', 'data_exfiltration_risk', 'attack_pattern_detected']:
-            if severity > 0.9:
-                penalty = int(penalty * 1.5)  # Extra penalty for very high severity
+    def _has_recent_anomalies(self, window_seconds: float = 3600) -> bool:
+        """Check whether any anomaly was seen within the window (default one hour)."""
+        times = self._recent_anomaly_times
+        cutoff = time.monotonic() - window_seconds
+        while times and times[0] < cutoff:
+            times.popleft()
+        
+        if times:
+            return True
+        
+        # Cold start: anomalies from before startup are only in the DB
+        if self._check_db_anomalies:
+            if self.db.get_recent_anomalies(hours=1):
+                return True
+            self._check_db_anomalies = False
+        
+        return False
+    
+    def _penalty_inputs(self, anomalies: List[Dict[str, Any]]) -> Tuple[np.ndarray, ...]:
+        """Gather per-anomaly arrays used by the batch penalty calculation."""
+        n = len(anomalies)
+        severity = np.fromiter(map(_get_severity, anomalies), dtype=np.float64, count=n)
+        type_ids = np.fromiter(map(_TYPE_ID.get, map(_get_anomaly_type, anomalies), repeat(_UNKNOWN_TYPE_ID)),
+                               dtype=np.int16, count=n)
+        
+        modifiers = _MOD_ARR[type_ids]
+        is_critical = _IS_CRITICAL_PENALTY[type_ids]
+        is_security = _IS_SECURITY[type_ids]
+        
+        # Metadata multipliers, in the same order as the scalar path
+        meta_mult = np.ones((n, 4))
+        for i, anomaly in enumerate(anomalies):
+            metadata = anomaly.get('metadata', {})
+            if not metadata:
+                continue
+            connection_count = metadata.get('connection_count')
+            if connection_count is not None and connection_count > 100:
+                meta_mult[i, 0] = 1.2
+            risk_level = metadata.get('risk_level')
+            if risk_level is not None:
+                meta_mult[i, 1] = _RISK_MULTIPLIERS.get(risk_level, 1.0)
+            launches_per_hour = metadata.get('launches_per_hour')
+            if launches_per_hour is not None and launches_per_hour > 20:
+                meta_mult[i, 2] = 1.3
+            bytes_per_sec = metadata.get('bytes_sent_rate')
+            if bytes_per_sec is not None and bytes_per_sec > 10 * 1024 * 1024:
+                meta_mult[i, 3] = 1.4
+        
+        return severity, modifiers, is_critical, is_security, meta_mult
+    
+    def _calculate_penalties(self, anomalies: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Vectorized penalty calculation for a batch of anomalies.
         
-        # Consider metadata for additional context
-        metadata = anomaly.get('metadata', {})
+        Base penalty by severity, scaled by the anomaly type modifier, the
+        critical-severity boost and the metadata multipliers, truncated to
+        whole points after each step; security threats cost at least 3 points
+        and any anomaly at least 1. Uses the compiled kernel when Numba is
+        installed.
         
-        # Network-specific penalty adjustments
-        if 'connection_count' in metadata and metadata['connection_count'] > 100:
-            penalty = int(penalty * 1.2)  # Extra penalty for many connections
+        Args:
+            anomalies: List of anomaly detection results
+            
+        Returns:
+            Array of integer penalties, one per anomaly
+        """
+        severity, modifiers, is_critical, is_security, meta_mult = self._penalty_inputs(anomalies)
         
-        if 'risk_level' in metadata:
-            risk_multipliers = {'low': 0.8, 'medium': 1.0, 'high': 1.3, 'critical': 1.6}
-            penalty = int(penalty * risk_multipliers.get(metadata['risk_level'], 1.0))
+        if _NUMBA_AVAILABLE:
+            return _penalty_kernel(severity, modifiers, is_critical, is_security, meta_mult,
+                                   self._sev_threshold_arr, self._sev_penalty_arr)
         
-        if 'launches_per_hour' in metadata and metadata['launches_per_hour'] > 20:
-            penalty = int(penalty * 1.3)  # Extra penalty for excessive app launches
+        # Base penalty based on severity
+        idx = np.searchsorted(self._sev_threshold_arr, severity, side='right') - 1
+        base = np.where(idx >= 0, self._sev_penalty_arr[np.maximum(idx, 0)], 0.0)
+        penalties = np.trunc(base * modifiers)
         
-        if 'bytes_sent_rate' in metadata:
-            # Extra penalty for high data transfer rates (potential exfiltration)
-            bytes_per_sec = metadata['bytes_sent_rate']
-            if bytes_per_sec > 10 * 1024 * 1024:  # > 10MB/s
-                penalty = int(penalty * 1.4)
+        # Extra penalty for very high severity critical anomalies
+        penalties = np.trunc(penalties * np.where(is_critical & (severity > 0.9), 1.5, 1.0))
         
-        # Ensure minimum penalty for security-related anomalies
-        security_types = [
-            'malicious_tool_usage', 'attack_pattern_detected', 'suspicious_ip_connection',
-            'malicious_port_access', 'data_exfiltration_risk', 'network_scanning',
-            'privilege_escalation', 'security_tool_usage'
-        ]
+        for col in range(meta_mult.shape[1]):
+            penalties = np.trunc(penalties * meta_mult[:, col])
         
-        if anomaly_type in security_types:
-            penalty = max(3, penalty)  # Minimum 3 points for security threats
-        else:
-            penalty = max(1, penalty)  # Minimum 1 point for any anomaly
+        # Minimum 3 points for security threats, 1 point for any anomaly
+        penalties = np.maximum(penalties, np.where(is_security, 3, 1))
         
-        return penalty
+        return penalties.astype(np.int64)
     
     def _check_alert_level(self, new_score: int, previous_score: int, anomaly_types: List[str] = None) -> Optional[str]:
         """Enhanced alert level checking with threat-specific triggers."""
-        # Check threshold crossings
-        for level, threshold in self.alert_thresholds.items():
-            if previous_score >= threshold > new_score:
-                return level
+        # Check threshold crossings (lowest crossed threshold wins)
+        new_bucket = bisect_right(self._alert_thresh, new_score)
+        if new_bucket < bisect_right(self._alert_thresh, previous_score):
+            return self._alert_levels[new_bucket]
         
         # Enhanced rapid drop detection
         score_drop = previous_score - new_score
@@ -304,22 +478,12 @@ class TrustScorer:
         
         # Threat-specific alert triggers (regardless of score drop)
         if anomaly_types:
-            critical_threats = {
-                'malicious_tool_usage', 'data_exfiltration_risk', 'attack_pattern_detected',
-                'malicious_port_access', 'network_scanning', 'connection_flooding'
-            }
-            
-            high_threats = {
-                'suspicious_ip_connection', 'privilege_escalation', 'attack_preparation',
-                'security_tool_usage', 'suspicious_late_activity'
-            }
-            
             # Trigger critical alert for any critical threat
-            if any(threat in critical_threats for threat in anomaly_types):
+            if not _CRITICAL_THREATS.isdisjoint(anomaly_types):
                 return 'critical'
             
             # Trigger warning for multiple high threats
-            high_threat_count = sum(1 for threat in anomaly_types if threat in high_threats)
+            high_threat_count = sum(map(_HIGH_THREATS.__contains__, anomaly_types))
             if high_threat_count >= 2:
                 return 'warning'
             elif high_threat_count >= 1:
@@ -327,23 +491,46 @@ class TrustScorer:
         
         return None
     
+    def _get_recent_history(self, hours: int = 24) -> deque:
+        """Return the cached trust history window, fetching only rows added since the last call."""
+        cache = self._history_cache
+        
+        # Evict entries that have aged out (same comparison as the DB query)
+        cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
+        while cache and not cache[0]['timestamp'] > cutoff:
+            cache.popleft()
+        
+        new_rows = self.db.get_trust_history_since(self._history_cache_id, hours=hours)
+        if new_rows:
+            cache.extend(new_rows)
+            self._history_cache_id = new_rows[-1]['id']
+        
+        return cache
+    
     def get_trust_status(self) -> Dict[str, Any]:
         """Get current trust status and recent history."""
         # Get recent trust history
-        history = self.db.get_trust_history(hours=24)
+        history = self._get_recent_history()
         recent_anomalies = self.db.get_recent_anomalies(hours=24)
         
         # Calculate statistics
-        if history:
-            score_changes = [h['score'] - (h['previous_score'] or h['score']) for h in history]
-            avg_score = sum(h['score'] for h in history) / len(history)
-            min_score_24h = min(h['score'] for h in history)
-            max_score_24h = max(h['score'] for h in history)
+        n = len(history)
+        if n:
+            # Gradual recovery leaves fractional scores in the history
+            scores = np.fromiter(map(_get_score, history), dtype=np.float64, count=n)
+            prev_scores = np.fromiter((h['previous_score'] or h['score'] for h in history),
+                                      dtype=np.float64, count=n)
+            avg_score = float(scores.mean())
+            min_score_24h = history[int(scores.argmin())]['score']
+            max_score_24h = history[int(scores.argmax())]['score']
+            total_change = float((scores - prev_scores).sum())
+            if total_change.is_integer():
+                total_change = int(total_change)
         else:
-            score_changes = []
             avg_score = self.current_score
             min_score_24h = self.current_score
             max_score_24h = self.current_score
+            total_change = 0
         
         # Determine current risk level
         risk_level = self._get_risk_level(self.current_score)
@@ -358,8 +545,8 @@ class TrustScorer:
                 'avg_score': round(avg_score, 1),
                 'min_score': min_score_24h,
                 'max_score': max_score_24h,
-                'score_changes': len(score_changes),
-                'total_change': sum(score_changes),
+                'score_changes': n,
+                'total_change': total_change,
                 'anomaly_count': len(recent_anomalies)
             },
             
@@ -377,21 +564,16 @@ class TrustScorer:
                 for a in recent_anomalies[-5:]  # Last 5 anomalies
             ],
             
-            'last_updated': datetime.now().isoformat()
+            'last_updated': self._now_iso()
         }
         
         return status
     
     def _get_risk_level(self, score: int) -> str:
         """Determine risk level based on current score."""
-        if score <= self.alert_thresholds['critical']:
-            return 'HIGH'
-        elif score <= self.alert_thresholds['warning']:
-            return 'MEDIUM'
-        elif score <= self.alert_thresholds['info']:
-            return 'LOW'
-        else:
-            return 'MINIMAL'
+        # Thresholds are whole numbers, so score <= t exactly when ceil(score) <= t;
+        # recovery steps leave fractional scores
+        return self._risk_table[max(self.min_score, min(self.max_score, math.ceil(score)))]
     
     def force_score_update(self, new_score: int, reason: str) -> Dict[str, Any]:
         """
@@ -404,7 +586,8 @@ class TrustScorer:
         Returns:
             Update result
         """
-        new_score = max(self.min_score, min(self.max_score, new_score))
+        min_score, max_score = self.min_score, self.max_score
+        new_score = min_score if new_score < min_score else max_score if new_score > max_score else new_score
         previous_score = self.current_score
         
         self.db.add_trust_score(
@@ -422,7 +605,7 @@ class TrustScorer:
             'new_score': new_score,
             'score_change': new_score - previous_score,
             'reason': reason,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self._now_iso()
         }
     
     def reset_trust_score(self, reason: str = "Trust score reset") -> Dict[str, Any]:
@@ -449,14 +632,12 @@ class TrustScorer:
                 'data_points': len(history)
             }
         
-        scores = [h['score'] for h in history]
+        scores = np.fromiter(map(_get_score, history), dtype=np.float64, count=len(history))
         
         # Calculate trend
-        first_half = scores[:len(scores)//2]
-        second_half = scores[len(scores)//2:]
-        
-        first_avg = sum(first_half) / len(first_half)
-        second_avg = sum(second_half) / len(second_half)
+        mid = len(scores) // 2
+        first_avg = float(scores[:mid].mean())
+        second_avg = float(scores[mid:].mean())
         
         trend_change = second_avg - first_avg
         
@@ -471,7 +652,7 @@ class TrustScorer:
             direction = 'down'
         
         # Calculate confidence based on data consistency
-        score_variance = np.var(scores) if len(scores) > 1 else 0
+        score_variance = float(scores.var())
         confidence = 'high' if score_variance < 25 else 'medium' if score_variance < 100 else 'low'
         
         return {
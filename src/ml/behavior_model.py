@@ -5,6 +5,7 @@ Uses IsolationForest to detect unusual usage patterns.
 
 import numpy as np
 import pandas as pd
+import os
 import pickle
 import logging
 from datetime import datetime, timedelta
@@ -15,11 +16,84 @@ from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 
+import joblib
+try:
+    from joblib import parallel_config
+except ImportError:  # joblib < 1.3
+    from joblib import parallel_backend as parallel_config
+
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:  # Numba is optional; severities are computed with NumPy instead
+    _NUMBA_AVAILABLE = False
+
 from .feature_extractor import FeatureExtractor
 
+if _NUMBA_AVAILABLE:
+    # Explicit signature: compiled eagerly at import (and cached on disk), so
+    # the first anomaly batch does not pay for JIT compilation
+    @njit('float64[:](float64[:], float64, float64, float64, float64)', cache=True)
+    def _severity_kernel(scores, th_critical, th_high, th_medium, th_low):
+        """Compiled piecewise severity (same bands as BehaviorModel._calculate_severity_vec)."""
+        out = np.empty(scores.shape[0])
+        for i in range(scores.shape[0]):
+            s = scores[i]
+            if s <= th_critical:
+                out[i] = 0.9 + (th_critical - s) * 0.2
+            elif s <= th_high:
+                out[i] = 0.7 + (th_high - s) * 0.6
+            elif s <= th_medium:
+                out[i] = 0.4 + (th_medium - s) * 0.6
+            elif s <= th_low:
+                out[i] = 0.2 + (th_low - s) * 0.4
+            else:
+                out[i] = max(0.1, 0.3 - s * 0.2)
+        return out
+
+class _FeatureRow:
+    """Read-only view of one row in a column-oriented (dict of arrays) feature table."""
+    
+    __slots__ = ('_columns', '_index')
+    
+    def __init__(self, columns: Dict[str, np.ndarray], index: int):
+        self._columns = columns
+        self._index = index
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        column = self._columns.get(key)
+        return default if column is None else column[self._index]
+
 class BehaviorModel:
     """AI-based behavioral monitoring model using anomaly detection."""
     
+    # Rows scored per decision_function call in detect_anomalies
+    _SCORE_CHUNK = 4096
+    
+    # High-risk ports for direct network connections
+    _SUSPICIOUS_PORTS = frozenset({22, 23, 135, 139, 445, 1433, 3389, 5432})
+    
+    # Connection count thresholds
+    _CONNECTION_FLOOD_THRESHOLD = 50       # Active connections for one event
+    _NETWORK_SCAN_THRESHOLD = 100          # Connections per hour
+    
+    # Event types whose classification never depends on the model score or
+    # other features; these are reported directly without running the model
+    _RULE_EVENT_TYPES = frozenset({
+        'high_bandwidth', 'connection_flooding', 'suspicious_port_connection',
+        'suspicious_application', 'suspicious_app_combination'
+    })
+    
+    # Severity for rule-based suspicious application events by reported risk level
+    _RISK_SEVERITY = {'critical': 0.95, 'high': 0.85, 'medium': 0.7, 'low': 0.5}
+    
+    # Application flag rules checked in order: (feature flag, anomaly type, message template)
+    _APP_FLAG_RULES = (
+        ('is_new_app', 'unknown_application', "First time seeing application: {}"),
+        ('is_network_tool', 'network_tool_usage', "Network tool launched: {}"),
+        ('is_admin_tool', 'privilege_escalation', "Administrative tool usage: {}"),
+    )
+    
     def __init__(self, model_path: str = "models/behavior_model.pkl"):
         self.model_path = Path(model_path)
         self.model_path.parent.mkdir(exist_ok=True)
@@ -27,6 +101,8 @@ class BehaviorModel:
         # Model components
         self.isolation_forest: Optional[IsolationForest] = None
         self.scaler: Optional[StandardScaler] = None
+        self._scaler_mean_f32: Optional[np.ndarray] = None
+        self._scaler_scale_f32: Optional[np.ndarray] = None
         self.feature_names: List[str] = []
         self.feature_extractor = FeatureExtractor()
         
@@ -34,6 +110,22 @@ class BehaviorModel:
         self.contamination = 0.15  # Increased from 0.1 - expect more anomalies (more sensitive)
         self.n_estimators = 150    # Increased from 100 for better detection
         self.random_state = 42
+        self.max_samples = 256         # Rows drawn per tree
+        self.max_train_rows = 50000    # Training rows kept before fitting
+        
+        # Prediction parallelism (IsolationForest ignores its own n_jobs at predict time)
+        self.predict_n_jobs = -1
+        self.parallel_predict_min_samples = 2000  # Thread dispatch costs more than it saves below this
+        self.threshold_sample_size = 10000         # Training rows scored to set anomaly thresholds
+        
+        # Incremental updates: bounded reservoir of training rows and drift-gated refits
+        self.reservoir_size = 50000
+        self.drift_tolerance = 0.5      # Shift of mean new-event score, in training score std units
+        self.warm_start_trees = 50      # Trees added per incremental refit
+        self._reservoir: Optional[np.ndarray] = None
+        self._reservoir_seen = 0        # Rows offered to the reservoir so far
+        self._new_since_fit = 0         # Rows added since the forest was last fitted
+        self._rng = np.random.default_rng(self.random_state)
         
         # Enhanced anomaly thresholds (more sensitive)
         self.anomaly_thresholds = {
@@ -43,6 +135,26 @@ class BehaviorModel:
             'low': 0.05           # Slightly unusual
         }
         
+        # Cached _is_weekend_normal result and the usage patterns it was computed from
+        self._weekend_cache_patterns = None
+        self._weekend_normal_cache = True
+        
+        # Event-type classifiers, checked before the security tool flag
+        self._type_handlers = {
+            'network_connection': self._classify_network_connection,
+            'high_bandwidth': self._classify_high_bandwidth,
+            'connection_flooding': self._classify_connection_flooding,
+            'suspicious_port_connection': self._classify_suspicious_port,
+            'suspicious_application': self._classify_suspicious_application,
+            'suspicious_app_combination': self._classify_app_combination,
+        }
+        
+        # Event-type classifiers, checked after the security tool flag
+        self._frequency_handlers = {
+            'high_frequency_app': self._classify_high_frequency_app,
+            'request_flooding': self._classify_request_flooding,
+        }
+        
         # Load existing model if available
         self._load_model()
         
@@ -53,14 +165,34 @@ class BehaviorModel:
                 logging.info("No existing model found, will train new model")
                 return False
             
-            with open(self.model_path, 'rb') as f:
-                model_data = pickle.load(f)
+            try:
+                # Memory-map the stored arrays instead of copying them into the heap
+                model_data = joblib.load(self.model_path, mmap_mode='r')
+            except Exception:
+                # Model files saved by older versions are plain pickles
+                with open(self.model_path, 'rb') as f:
+                    model_data = pickle.load(f)
+            
+            # A model fitted on another feature layout would be rejected on every
+            # detection cycle; drop it so the training path builds a new one
+            feature_names = list(model_data['feature_names'])
+            saved = set(feature_names)
+            current = [f for f in self.feature_extractor.ML_FEATURE_COLUMNS if f in saved]
+            if current != feature_names:
+                logging.warning("Saved model uses an outdated feature layout, discarding it for retraining")
+                return False
             
             self.isolation_forest = model_data['model']
             self.scaler = model_data['scaler']
-            self.feature_names = model_data['feature_names']
+            self._cache_scaler_params()
+            self.feature_names = feature_names
             self.training_info = model_data.get('training_info', {})
             
+            # Copy out of the read-only memory map, since updates modify it in place
+            reservoir = model_data.get('reservoir')
+            self._reservoir = np.array(reservoir) if reservoir is not None else None
+            self._reservoir_seen = model_data.get('reservoir_seen', 0)
+            
             logging.info(f"Loaded model trained at {self.training_info.get('trained_at')}")
             return True
             
@@ -75,11 +207,16 @@ class BehaviorModel:
                 'model': self.isolation_forest,
                 'scaler': self.scaler,
                 'feature_names': self.feature_names,
-                'training_info': self.training_info
+                'training_info': self.training_info,
+                'reservoir': self._reservoir,
+                'reservoir_seen': self._reservoir_seen
             }
             
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(model_data, f)
+            # Uncompressed so the arrays can be memory-mapped on load. Write to a
+            # temporary file and swap it in, since a loaded model may still map the old one.
+            tmp_path = self.model_path.with_suffix(self.model_path.suffix + '.tmp')
+            joblib.dump(model_data, tmp_path)
+            os.replace(tmp_path, self.model_path)
             
             logging.info(f"Model saved to {self.model_path}")
             
@@ -124,68 +261,154 @@ class BehaviorModel:
             if X.size == 0:
                 return {'status': 'error', 'message': 'No valid training data after cleaning'}
             
-            logging.info(f"Training on {X.shape[0]} samples with {X.shape[1]} features")
-            
-            # Scale features
-            self.scaler = StandardScaler()
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Train isolation forest
-            self.isolation_forest = IsolationForest(
-                contamination=self.contamination,
-                n_estimators=self.n_estimators,
-                random_state=self.random_state,
-                n_jobs=-1  # Use all cores
-            )
-            
-            self.isolation_forest.fit(X_scaled)
-            self.feature_names = feature_names
-            
-            # Update training info
-            self.training_info = {
-                'trained_at': datetime.now().isoformat(),
-                'training_samples': X.shape[0],
-                'feature_count': X.shape[1],
-                'model_version': '1.0',
-                'contamination': self.contamination
-            }
-            
-            # Save model
-            self._save_model()
-            
-            # Evaluate on training data to set thresholds
-            scores = self.isolation_forest.decision_function(X_scaled)
-            
-            # Calculate percentiles for thresholds
-            self.anomaly_thresholds = {
-                'high': np.percentile(scores, 5),    # Bottom 5% are clear anomalies
-                'medium': np.percentile(scores, 15), # Bottom 15% are suspicious
-                'low': np.percentile(scores, 30)     # Bottom 30% are slightly unusual
-            }
+            # Each tree only sees max_samples rows, so cap the array handed to fit()
+            if X.shape[0] > self.max_train_rows:
+                rng = np.random.default_rng(self.random_state)
+                X = X[rng.choice(X.shape[0], size=self.max_train_rows, replace=False)]
+                logging.info(f"Downsampled training data to {self.max_train_rows} rows")
             
-            result = {
-                'status': 'success',
-                'training_samples': X.shape[0],
-                'features': feature_names,
-                'anomaly_thresholds': self.anomaly_thresholds,
-                'training_info': self.training_info
-            }
+            # Seed the reservoir used by incremental updates
+            self._reservoir_seen = X.shape[0]
+            if X.shape[0] > self.reservoir_size:
+                self._reservoir = X[self._rng.choice(X.shape[0], size=self.reservoir_size, replace=False)]
+            else:
+                self._reservoir = X.copy()
             
-            logging.info(f"Model training completed successfully: {result}")
-            return result
+            return self._fit_matrix(X, feature_names)
             
         except Exception as e:
             logging.error(f"Error training model: {e}")
             return {'status': 'error', 'message': str(e)}
     
+    def _fit_matrix(self, X: np.ndarray, feature_names: List[str]) -> Dict[str, Any]:
+        """Fit scaler and forest on a clean feature matrix, set thresholds and save."""
+        logging.info(f"Training on {X.shape[0]} samples with {X.shape[1]} features")
+        
+        # Scale features
+        self.scaler = StandardScaler()
+        X_scaled = self.scaler.fit_transform(X)
+        self._cache_scaler_params()
+        
+        # Train isolation forest
+        self.isolation_forest = IsolationForest(
+            contamination=self.contamination,
+            n_estimators=self.n_estimators,
+            max_samples=min(self.max_samples, X.shape[0]),
+            random_state=self.random_state,
+            n_jobs=-1  # Use all cores
+        )
+        
+        self.isolation_forest.fit(X_scaled)
+        self.feature_names = feature_names
+        self._new_since_fit = 0
+        
+        # Evaluate on training data to set thresholds
+        scores = self._sample_scores(X_scaled)
+        self.anomaly_thresholds = self._percentile_thresholds(scores)
+        
+        # Update training info
+        self.training_info = {
+            'trained_at': datetime.now().isoformat(),
+            'training_samples': X.shape[0],
+            'feature_count': X.shape[1],
+            'model_version': '1.0',
+            'contamination': self.contamination,
+            'score_mean': float(scores.mean()),
+            'score_std': float(scores.std())
+        }
+        
+        # Save model
+        self._save_model()
+        
+        result = {
+            'status': 'success',
+            'training_samples': X.shape[0],
+            'features': feature_names,
+            'anomaly_thresholds': self.anomaly_thresholds,
+            'training_info': self.training_info
+        }
+        
+        logging.info("Model training completed successfully: %s", result)
+        return result
+    
+    def _decision_scores(self, X_scaled: np.ndarray) -> np.ndarray:
+        """
+        Score samples in fixed-size chunks to bound peak memory on long batches.
+        
+        Trees are scored on threads when the batch is large enough to benefit.
+        """
+        n = X_scaled.shape[0]
+        n_jobs = self.predict_n_jobs if n >= self.parallel_predict_min_samples else 1
+        
+        with parallel_config(backend="threading", n_jobs=n_jobs):
+            if n <= self._SCORE_CHUNK:
+                return self.isolation_forest.decision_function(X_scaled)
+            
+            return np.concatenate([
+                self.isolation_forest.decision_function(X_scaled[start:start + self._SCORE_CHUNK])
+                for start in range(0, n, self._SCORE_CHUNK)
+            ])
+    
+    def _sample_scores(self, X_scaled: np.ndarray) -> np.ndarray:
+        """
+        Score (a sample of) training data for threshold and drift statistics.
+        
+        Percentiles converge quickly, so at most threshold_sample_size rows are
+        scored instead of re-walking the forest for the whole training set.
+        """
+        n = X_scaled.shape[0]
+        if n > self.threshold_sample_size:
+            rng = np.random.default_rng(self.random_state)
+            X_scaled = X_scaled[rng.choice(n, size=self.threshold_sample_size, replace=False)]
+        
+        with parallel_config(backend="threading", n_jobs=self.predict_n_jobs):
+            return self.isolation_forest.decision_function(X_scaled)
+    
+    def _percentile_thresholds(self, scores: np.ndarray) -> Dict[str, float]:
+        """Derive severity thresholds from training score percentiles."""
+        # Calculate percentiles for thresholds (one selection pass for all three)
+        high, medium, low = np.quantile(scores, [0.05, 0.15, 0.30])
+        return {
+            'critical': self.anomaly_thresholds['critical'],  # Fixed, not data-driven
+            'high': high,      # Bottom 5% are clear anomalies
+            'medium': medium,  # Bottom 15% are suspicious
+            'low': low         # Bottom 30% are slightly unusual
+        }
+    
+    def _cache_scaler_params(self):
+        """Keep float32 copies of the scaler parameters for prediction-time scaling."""
+        n_features = self.scaler.n_features_in_
+        mean = self.scaler.mean_ if self.scaler.mean_ is not None else np.zeros(n_features)
+        scale = self.scaler.scale_ if self.scaler.scale_ is not None else np.ones(n_features)
+        self._scaler_mean_f32 = mean.astype(np.float32)
+        self._scaler_scale_f32 = scale.astype(np.float32)
+    
+    def _scale_features(self, X: np.ndarray) -> np.ndarray:
+        """
+        Standardize features as a C-contiguous float32 array.
+        
+        The trees compare in float32, so scaling in float32 avoids a float64
+        intermediate and the extra cast inside decision_function.
+        """
+        if X.shape[1] != len(self._scaler_mean_f32):
+            # Same error StandardScaler.transform would raise
+            raise ValueError(f"X has {X.shape[1]} features, but StandardScaler is expecting "
+                             f"{len(self._scaler_mean_f32)} features as input.")
+        
+        X_scaled = np.array(X, dtype=np.float32, order='C')  # Always a copy; scaled in place below
+        X_scaled -= self._scaler_mean_f32
+        X_scaled /= self._scaler_scale_f32
+        return X_scaled
+    
     def _clean_training_data(self, X: np.ndarray) -> np.ndarray:
         """Clean training data by removing invalid values."""
         # Remove rows with NaN or infinite values
         mask = np.isfinite(X).all(axis=1)
-        X_clean = X[mask]
+        if mask.all():
+            return X  # Common case: nothing to drop, skip the copy
         
-        if len(X_clean) < len(X):
-            logging.warning(f"Removed {len(X) - len(X_clean)} invalid samples during training")
+        X_clean = X[mask]
+        logging.warning(f"Removed {len(X) - len(X_clean)} invalid samples during training")
         
         return X_clean
     
@@ -206,140 +429,192 @@ class BehaviorModel:
         if not events:
             return []
         
+        # Event types that classify themselves skip the ML pipeline entirely
+        rule_events = [e for e in events if e.get('event_type') in self._RULE_EVENT_TYPES]
+        rule_anomalies = [self._rule_anomaly(e) for e in rule_events]
+        if rule_events:
+            events = [e for e in events if e.get('event_type') not in self._RULE_EVENT_TYPES]
+            if not events:
+                return rule_anomalies
+        
         try:
             # Extract features
             df = self.feature_extractor.extract_event_features(events)
             if df.empty:
-                return []
+                return rule_anomalies
             
             # Prepare features for ML
-            X, _ = self.feature_extractor.prepare_features_for_ml(df)
+            X, feature_names = self.feature_extractor.prepare_features_for_ml(df)
             if X.size == 0:
-                return []
+                return rule_anomalies
             
-            # Ensure feature consistency
-            if X.shape[1] != len(self.feature_names):
-                logging.error(f"Feature count mismatch: got {X.shape[1]}, expected {len(self.feature_names)}")
-                return []
+            # Ensure feature consistency (same columns in the same order, not just the same count)
+            if feature_names != self.feature_names:
+                missing = sorted(set(self.feature_names) - set(feature_names))
+                unexpected = sorted(set(feature_names) - set(self.feature_names))
+                logging.error(f"Feature layout mismatch: missing {missing}, unexpected {unexpected}, "
+                              f"got {len(feature_names)}, expected {len(self.feature_names)}")
+                return rule_anomalies
             
             # Scale features
-            X_scaled = self.scaler.transform(X)
+            X_scaled = self._scale_features(X)
             
             # Predict anomalies
-            anomaly_labels = self.isolation_forest.predict(X_scaled)
-            anomaly_scores = self.isolation_forest.decision_function(X_scaled)
+            anomaly_scores = self._decision_scores(X_scaled)
+            
+            # Anomalies are the rows predict() would label -1 (decision_function
+            # already subtracts offset_); only those rows are materialized
+            anomaly_idx = np.flatnonzero(anomaly_scores[:len(events)] < 0)
+            columns = {c: df[c].to_numpy() for c in df.columns}
+            anomaly_features = [_FeatureRow(columns, i) for i in anomaly_idx.tolist()]
+            severities = self._calculate_severity_vec(anomaly_scores[anomaly_idx]).tolist()
             
             # Process results
-            anomalies = []
-            for i, (event, label, score) in enumerate(zip(events, anomaly_labels, anomaly_scores)):
-                if label == -1:  # Anomaly detected
-                    severity = self._calculate_severity(score)
-                    anomaly_type, description = self._classify_anomaly(event, df.iloc[i], score)
-                    
-                    anomaly = {
-                        'event_id': event['id'],
-                        'event': event,
-                        'anomaly_score': float(score),
-                        'severity': severity,
-                        'anomaly_type': anomaly_type,
-                        'description': description,
-                        'detected_at': datetime.now().isoformat(),
-                        'model_info': {
-                            'model_version': self.training_info.get('model_version'),
-                            'trained_at': self.training_info.get('trained_at')
-                        }
+            log_anomalies = logging.getLogger().isEnabledFor(logging.INFO)
+            anomalies = rule_anomalies
+            for i, features, severity in zip(anomaly_idx.tolist(), anomaly_features, severities):
+                event = events[i]
+                score = anomaly_scores[i]
+                anomaly_type, description = self._classify_anomaly(event, features, score)
+                
+                anomaly = {
+                    'event_id': event['id'],
+                    'event': event,
+                    'anomaly_score': float(score),
+                    'severity': severity,
+                    'anomaly_type': anomaly_type,
+                    'description': description,
+                    'detected_at': datetime.now().isoformat(),
+                    'model_info': {
+                        'model_version': self.training_info.get('model_version'),
+                        'trained_at': self.training_info.get('trained_at')
                     }
-                    
-                    anomalies.append(anomaly)
-                    
-                    logging.info(f"Anomaly detected: {anomaly_type} (severity: {severity:.2f}, score: {score:.3f})")
+                }
+                
+                anomalies.append(anomaly)
+                
+                if log_anomalies:
+                    logging.info("Anomaly detected: %s (severity: %.2f, score: %.3f)", anomaly_type, severity, score)
             
             return anomalies
             
         except Exception as e:
             logging.error(f"Error detecting anomalies: {e}")
-            return []
+            return rule_anomalies
+    
+    def _rule_anomaly(self, event: Dict) -> Dict[str, Any]:
+        """Build an anomaly result for a self-classifying event type without model scoring."""
+        metadata = event.get('metadata') or {}
+        handler = self._type_handlers[event['event_type']]
+        anomaly_type, description = handler(event.get('app_name', 'unknown'), metadata, {})
+        severity = self._rule_severity(event['event_type'], metadata)
+        
+        if logging.getLogger().isEnabledFor(logging.INFO):
+            logging.info("Anomaly detected: %s (severity: %.2f, rule-based)", anomaly_type, severity)
+        
+        return {
+            'event_id': event['id'],
+            'event': event,
+            'anomaly_score': None,  # Not scored by the model
+            'severity': severity,
+            'anomaly_type': anomaly_type,
+            'description': description,
+            'detected_at': datetime.now().isoformat(),
+            'model_info': {
+                'model_version': self.training_info.get('model_version'),
+                'trained_at': self.training_info.get('trained_at'),
+                'detection': 'rule'
+            }
+        }
+    
+    def _rule_severity(self, event_type: str, metadata: Dict) -> float:
+        """Severity for rule-based anomalies, derived from the event metadata."""
+        if event_type == 'suspicious_application':
+            return self._RISK_SEVERITY.get(metadata.get('risk_level'), 0.75)
+        
+        if event_type == 'suspicious_app_combination':
+            return 0.9
+        
+        if event_type == 'suspicious_port_connection':
+            return 0.8
+        
+        if event_type == 'connection_flooding':
+            return 0.6 + min(metadata.get('connection_count', 0) / 500, 0.3)
+        
+        if event_type == 'high_bandwidth':
+            return 0.6 + min(metadata.get('bytes_sent_rate', 0) / (100 * 1024 * 1024), 0.3)
+        
+        return 0.5
     
     def _calculate_severity(self, score: float) -> float:
         """Enhanced severity calculation based on score with more granular levels."""
-        if score <= self.anomaly_thresholds['critical']:
-            return 0.9 + (self.anomaly_thresholds['critical'] - score) * 0.2  # 0.9-1.0
-        elif score <= self.anomaly_thresholds['high']:
-            return 0.7 + (self.anomaly_thresholds['high'] - score) * 0.6    # 0.7-0.9
-        elif score <= self.anomaly_thresholds['medium']:
-            return 0.4 + (self.anomaly_thresholds['medium'] - score) * 0.6  # 0.4-0.7
-        elif score <= self.anomaly_thresholds['low']:
-            return 0.2 + (self.anomaly_thresholds['low'] - score) * 0.4     # 0.2-0.4
-        else:
-            return max(0.1, 0.3 - score * 0.2)  # 0.1-0.3
-    
-    def _classify_anomaly(self, event: Dict, features: pd.Series, score: float) -> Tuple[str, str]:
+        return float(self._calculate_severity_vec(np.array([score]))[0])
+    
+    def _calculate_severity_vec(self, scores: np.ndarray) -> np.ndarray:
+        """Vectorized severity for an array of anomaly scores."""
+        scores = np.asarray(scores, dtype=np.float64)
+        critical = self.anomaly_thresholds['critical']
+        high = self.anomaly_thresholds['high']
+        medium = self.anomaly_thresholds['medium']
+        low = self.anomaly_thresholds['low']
+        
+        if _NUMBA_AVAILABLE:
+            return _severity_kernel(np.ascontiguousarray(scores), float(critical), float(high),
+                                    float(medium), float(low))
+        
+        return np.select(
+            [scores <= critical, scores <= high, scores <= medium, scores <= low],
+            [
+                0.9 + (critical - scores) * 0.2,  # 0.9-1.0
+                0.7 + (high - scores) * 0.6,      # 0.7-0.9
+                0.4 + (medium - scores) * 0.6,    # 0.4-0.7
+                0.2 + (low - scores) * 0.4,       # 0.2-0.4
+            ],
+            default=np.maximum(0.1, 0.3 - scores * 0.2)  # 0.1-0.3
+        )
+    
+    def _classify_anomaly(self, event: Dict, features: Dict[str, Any], score: float) -> Tuple[str, str]:
         """Enhanced anomaly classification with network and security patterns."""
         app_name = event.get('app_name', 'unknown')
         event_type = event.get('event_type', 'unknown')
-        timestamp = pd.to_datetime(event['timestamp'])
         metadata = event.get('metadata', {})
         
-        # 1. NETWORK-BASED ANOMALIES (NEW)
-        if event_type == 'network_connection':
-            remote_ip = metadata.get('remote_ip', '')
-            remote_port = metadata.get('remote_port', 0)
-            
-            if metadata.get('is_suspicious_ip', False):
-                return 'suspicious_ip_connection', f"Connection to suspicious IP: {remote_ip}:{remote_port}"
-            
-            if remote_port in {22, 23, 135, 139, 445, 1433, 3389, 5432}:
-                return 'suspicious_port_access', f"Connection to high-risk port: {remote_ip}:{remote_port}"
-            
-            connection_count = features.get('connection_count', 0)
-            if connection_count > 50:
-                return 'connection_flooding', f"Excessive connections: {connection_count} active connections"
-        
-        elif event_type == 'high_bandwidth':
-            bytes_sent = metadata.get('bytes_sent_rate', 0)
-            bytes_recv = metadata.get('bytes_recv_rate', 0)
-            return 'bandwidth_anomaly', f"High bandwidth usage: {bytes_sent/1024/1024:.1f}MB/s sent, {bytes_recv/1024/1024:.1f}MB/s received"
-        
-        elif event_type == 'connection_flooding':
-            return 'network_flooding', f"Connection flooding: {metadata.get('connection_count', 0)} connections in 5 minutes"
-        
-        elif event_type == 'suspicious_port_connection':
-            return 'malicious_port_access', f"Access to attack-vector port: {metadata.get('remote_port', 0)}"
+        # 1. NETWORK AND ATTACK-TOOL EVENT TYPES (dispatch by event type, before
+        # any feature or timestamp work)
+        handler = self._type_handlers.get(event_type)
+        if handler is not None:
+            result = handler(app_name, metadata, features)
+            if result:
+                return result
         
         # 2. SECURITY TOOL ANOMALIES (NEW)
-        elif event_type == 'suspicious_application':
-            risk_level = metadata.get('risk_level', 'unknown')
-            keyword = metadata.get('suspicious_keyword', '')
-            return 'malicious_tool_usage', f"Suspicious tool detected: {app_name} (keyword: {keyword}, risk: {risk_level})"
-        
-        elif event_type == 'suspicious_app_combination':
-            pattern = metadata.get('pattern_keywords', [])
-            return 'attack_pattern_detected', f"Suspicious tool combination: {pattern} including {app_name}"
-        
         elif features.get('is_security_tool', False):
             return 'security_tool_usage', f"Security/hacking tool launched: {app_name}"
         
         # 3. APPLICATION FREQUENCY ANOMALIES (ENHANCED)
-        elif event_type == 'high_frequency_app':
-            launches = metadata.get('launches_per_hour', 0)
-            return 'app_abuse_pattern', f"Excessive app launches: {app_name} launched {launches} times in 1 hour"
-        
-        elif event_type == 'request_flooding':
-            rate = metadata.get('launches_per_minute', 0)
-            return 'system_flooding', f"Request flooding: {rate} app launches per minute"
+        elif event_type in self._frequency_handlers:
+            return self._frequency_handlers[event_type](app_name, metadata, features)
         
         elif features.get('is_flooding_behavior', False):
             return 'behavioral_flooding', f"Flooding behavior detected with {app_name}"
         
+        # Hour and minute were already parsed by the feature extractor
+        hour = features.get('hour_of_day')
+        minute = features.get('minute_of_hour')
+        if hour is None or minute is None:
+            timestamp = pd.to_datetime(event['timestamp'])
+            hour, minute = timestamp.hour, timestamp.minute
+        clock = f"{int(hour):02d}:{int(minute):02d}"
+        
         # 4. TIME-BASED ANOMALIES (ORIGINAL + ENHANCED)
         if features.get('is_very_late', False) and features.get('is_security_tool', False):
-            return 'suspicious_late_activity', f"Security tool usage at suspicious hour: {app_name} at {timestamp.hour:02d}:{timestamp.minute:02d}"
+            return 'suspicious_late_activity', f"Security tool usage at suspicious hour: {app_name} at {clock}"
         
         elif features.get('is_very_late', False):
-            return 'unusual_time', f"Activity at very late hour ({timestamp.hour:02d}:{timestamp.minute:02d})"
+            return 'unusual_time', f"Activity at very late hour ({clock})"
         
         elif features.get('is_very_early', False):
-            return 'unusual_time', f"Activity at very early hour ({timestamp.hour:02d}:{timestamp.minute:02d})"
+            return 'unusual_time', f"Activity at very early hour ({clock})"
         
         elif features.get('is_weekend', False) and not self._is_weekend_normal():
             return 'unusual_schedule', f"Unusual weekend activity with {app_name}"
@@ -349,14 +624,9 @@ class BehaviorModel:
         if app_rarity > 0.8:  # Very rare application
             return 'rare_application', f"Very rare application launched: {app_name} (rarity: {app_rarity:.2f})"
         
-        elif features.get('is_new_app', False):
-            return 'unknown_application', f"First time seeing application: {app_name}"
-        
-        elif features.get('is_network_tool', False):
-            return 'network_tool_usage', f"Network tool launched: {app_name}"
-        
-        elif features.get('is_admin_tool', False):
-            return 'privilege_escalation', f"Administrative tool usage: {app_name}"
+        for flag, anomaly_type, message in self._APP_FLAG_RULES:
+            if features.get(flag, False):
+                return anomaly_type, message.format(app_name)
         
         # 6. PATTERN-BASED ANOMALIES (ENHANCED)
         apps_in_5min = features.get('apps_in_5min', 0)
@@ -384,7 +654,7 @@ class BehaviorModel:
             return 'data_exfiltration_risk', f"High bandwidth usage with {app_name} - potential data exfiltration"
         
         connections_per_hour = features.get('connections_per_hour', 0)
-        if connections_per_hour > 100:
+        if connections_per_hour > self._NETWORK_SCAN_THRESHOLD:
             return 'network_scanning', f"Excessive network connections: {connections_per_hour} per hour"
         
         # 10. SECURITY ESCALATION PATTERNS (NEW)
@@ -396,11 +666,74 @@ class BehaviorModel:
             return 'attack_preparation', f"Multiple security tools used: {security_tools_per_hour} tools in 1 hour"
         
         # Default classification for any remaining anomalies
-        return 'behavioral_anomaly', f"Unusual behavior pattern detected for {app_name} at {timestamp.strftime('%H:%M')}"
+        return 'behavioral_anomaly', f"Unusual behavior pattern detected for {app_name} at {clock}"
+    
+    def _classify_network_connection(self, app_name: str, metadata: Dict, features: Dict) -> Optional[Tuple[str, str]]:
+        """Classify a network connection; returns None to fall through."""
+        remote_ip = metadata.get('remote_ip', '')
+        remote_port = metadata.get('remote_port', 0)
+        
+        if metadata.get('is_suspicious_ip', False):
+            return 'suspicious_ip_connection', f"Connection to suspicious IP: {remote_ip}:{remote_port}"
+        
+        if remote_port in self._SUSPICIOUS_PORTS:
+            return 'suspicious_port_access', f"Connection to high-risk port: {remote_ip}:{remote_port}"
+        
+        connection_count = features.get('connection_count', 0)
+        if connection_count > self._CONNECTION_FLOOD_THRESHOLD:
+            return 'connection_flooding', f"Excessive connections: {connection_count} active connections"
+        
+        return None  # Fall through to the time/app-based checks
+    
+    def _classify_high_bandwidth(self, app_name: str, metadata: Dict, features: Dict) -> Tuple[str, str]:
+        """Classify a high bandwidth event."""
+        bytes_sent = metadata.get('bytes_sent_rate', 0)
+        bytes_recv = metadata.get('bytes_recv_rate', 0)
+        return 'bandwidth_anomaly', f"High bandwidth usage: {bytes_sent/1024/1024:.1f}MB/s sent, {bytes_recv/1024/1024:.1f}MB/s received"
+    
+    def _classify_connection_flooding(self, app_name: str, metadata: Dict, features: Dict) -> Tuple[str, str]:
+        """Classify a connection flooding event."""
+        return 'network_flooding', f"Connection flooding: {metadata.get('connection_count', 0)} connections in 5 minutes"
+    
+    def _classify_suspicious_port(self, app_name: str, metadata: Dict, features: Dict) -> Tuple[str, str]:
+        """Classify a connection to an attack-vector port."""
+        return 'malicious_port_access', f"Access to attack-vector port: {metadata.get('remote_port', 0)}"
+    
+    def _classify_suspicious_application(self, app_name: str, metadata: Dict, features: Dict) -> Tuple[str, str]:
+        """Classify a suspicious tool launch."""
+        risk_level = metadata.get('risk_level', 'unknown')
+        keyword = metadata.get('suspicious_keyword', '')
+        return 'malicious_tool_usage', f"Suspicious tool detected: {app_name} (keyword: {keyword}, risk: {risk_level})"
+    
+    def _classify_app_combination(self, app_name: str, metadata: Dict, features: Dict) -> Tuple[str, str]:
+        """Classify a suspicious combination of tools."""
+        pattern = metadata.get('pattern_keywords', [])
+        return 'attack_pattern_detected', f"Suspicious tool combination: {pattern} including {app_name}"
+    
+    def _classify_high_frequency_app(self, app_name: str, metadata: Dict, features: Dict) -> Tuple[str, str]:
+        """Classify excessive launches of one application."""
+        launches = metadata.get('launches_per_hour', 0)
+        return 'app_abuse_pattern', f"Excessive app launches: {app_name} launched {launches} times in 1 hour"
+    
+    def _classify_request_flooding(self, app_name: str, metadata: Dict, features: Dict) -> Tuple[str, str]:
+        """Classify app launch request flooding."""
+        rate = metadata.get('launches_per_minute', 0)
+        return 'system_flooding', f"Request flooding: {rate} app launches per minute"
     
     def _is_weekend_normal(self) -> bool:
         """Check if weekend activity is normal based on historical patterns."""
         patterns = self.feature_extractor.usage_patterns
+        
+        # Usage patterns are replaced wholesale when re-extracted, so cache per object
+        if patterns is self._weekend_cache_patterns:
+            return self._weekend_normal_cache
+        
+        self._weekend_cache_patterns = patterns
+        self._weekend_normal_cache = self._compute_weekend_normal(patterns)
+        return self._weekend_normal_cache
+    
+    def _compute_weekend_normal(self, patterns: Dict[str, Any]) -> bool:
+        """Compare weekend and weekday event counts from usage patterns."""
         weekend_usage = patterns.get('weekend_usage', {})
         weekday_usage = patterns.get('weekday_usage', {})
         
@@ -418,6 +751,11 @@ class BehaviorModel:
         """
         Update model with new events if enough data accumulated.
         
+        New feature rows are reservoir-sampled into a bounded training buffer.
+        The forest is only refitted once enough rows arrived and their scores
+        have drifted from the training distribution; refits add trees on the
+        buffer (warm start) rather than discarding the forest.
+        
         Args:
             new_events: New events to potentially include in training
             retrain_threshold: Minimum new events before retraining
@@ -425,11 +763,91 @@ class BehaviorModel:
         if len(new_events) < retrain_threshold:
             return
         
-        logging.info(f"Retraining model with {len(new_events)} new events")
+        if self.isolation_forest is None or self._reservoir is None:
+            logging.info(f"Retraining model with {len(new_events)} new events")
+            self.train(new_events, force_retrain=True)
+            return
+        
+        try:
+            df = self.feature_extractor.extract_event_features(new_events)
+            if df.empty:
+                return
+            
+            X, feature_names = self.feature_extractor.prepare_features_for_ml(df)
+            if feature_names != self.feature_names:
+                # Feature layout changed; the buffer and scaler no longer apply
+                logging.info(f"Feature set changed, retraining model with {len(new_events)} new events")
+                self.train(new_events, force_retrain=True)
+                return
+            
+            X = self._clean_training_data(X)
+            if X.size == 0:
+                return
+            
+            self._add_to_reservoir(X)
+            self._new_since_fit += X.shape[0]
+            
+            # Compare new scores against the training score distribution
+            scores = self._decision_scores(self._scale_features(X))
+            score_std = max(self.training_info.get('score_std', 0.0), 1e-9)
+            drift = abs(float(scores.mean()) - self.training_info.get('score_mean', 0.0)) / score_std
+            
+            if self._new_since_fit < retrain_threshold or drift <= self.drift_tolerance:
+                logging.info(f"No significant drift ({drift:.2f}), keeping current model")
+                self._save_model()
+                return
+            
+            logging.info(f"Score drift {drift:.2f} over {self._new_since_fit} new rows, refitting model")
+            self._refit_on_reservoir()
+            
+        except Exception as e:
+            logging.error(f"Error updating model: {e}")
+    
+    def _add_to_reservoir(self, X: np.ndarray):
+        """Reservoir-sample rows of X into the bounded training buffer."""
+        free = self.reservoir_size - self._reservoir.shape[0]
+        if free > 0:
+            self._reservoir = np.vstack([self._reservoir, X[:free]])
+            self._reservoir_seen += min(free, X.shape[0])
+            X = X[free:]
+        
+        if X.shape[0] == 0:
+            return
+        
+        # Row k (1-based among all rows seen) replaces a random slot with probability size/k
+        seen = self._reservoir_seen + np.arange(1, X.shape[0] + 1)
+        slots = self._rng.integers(0, seen)
+        keep = slots < self.reservoir_size
+        self._reservoir[slots[keep]] = X[keep]
+        self._reservoir_seen += X.shape[0]
+    
+    def _refit_on_reservoir(self):
+        """Refit on the training buffer, adding trees to the forest where possible."""
+        forest = self.isolation_forest
+        n_trees = forest.n_estimators + self.warm_start_trees
+        
+        if n_trees > 2 * self.n_estimators:
+            # Forest has grown enough; rebuild from scratch with a fresh scaler
+            self._fit_matrix(self._reservoir, self.feature_names)
+            return
         
-        # Get existing training data if possible and combine with new data
-        # For simplicity, just retrain on new data (in production, you'd want to combine)
-        self.train(new_events, force_retrain=True)
+        # Existing trees keep the current scaler, so new trees use it too
+        X_scaled = self._scale_features(self._reservoir)
+        forest.set_params(warm_start=True, n_estimators=n_trees)
+        forest.fit(X_scaled)
+        self._new_since_fit = 0
+        
+        scores = self._sample_scores(X_scaled)
+        self.anomaly_thresholds = self._percentile_thresholds(scores)
+        self.training_info.update({
+            'trained_at': datetime.now().isoformat(),
+            'training_samples': self._reservoir.shape[0],
+            'score_mean': float(scores.mean()),
+            'score_std': float(scores.std())
+        })
+        
+        self._save_model()
+        logging.info(f"Added {self.warm_start_trees} trees, forest now has {n_trees}")
     
     def get_model_status(self) -> Dict[str, Any]:
         """Get current model status and information."""
@@ -442,6 +860,15 @@ class BehaviorModel:
             'model_path': str(self.model_path)
         }
     
+    def _extract_single(self, event: Dict) -> np.ndarray:
+        """Feature vector (1 x n_features) for one event, in model feature order."""
+        features = self.feature_extractor.extract_single_event_features(event)
+        
+        x = np.array([[0.0 if features.get(name) is None else float(features[name])
+                       for name in self.feature_names]])
+        x[np.isnan(x)] = 0.0  # Same fill as prepare_features_for_ml
+        return x
+    
     def explain_prediction(self, event: Dict) -> Dict[str, Any]:
         """
         Provide explanation for a prediction (for debugging/transparency).
@@ -456,21 +883,16 @@ class BehaviorModel:
             return {'error': 'Model not trained'}
         
         try:
-            # Extract features
-            df = self.feature_extractor.extract_event_features([event])
-            if df.empty:
-                return {'error': 'Could not extract features'}
-            
-            X, _ = self.feature_extractor.prepare_features_for_ml(df)
-            if X.size == 0:
-                return {'error': 'No ML features available'}
+            # Build the feature vector directly; a lone event has no sequence
+            # context, so sequential features take their fill value of 0
+            x = self._extract_single(event)
             
-            X_scaled = self.scaler.transform(X)
-            score = self.isolation_forest.decision_function(X_scaled)[0]
-            prediction = self.isolation_forest.predict(X_scaled)[0]
+            # Single sample: score without any joblib dispatch
+            score = float(self.isolation_forest.decision_function(self._scale_features(x))[0])
+            prediction = -1 if score < 0 else 1
             
             # Get feature values
-            feature_values = dict(zip(self.feature_names, X[0]))
+            feature_values = dict(zip(self.feature_names, x[0].tolist()))
             
             explanation = {
                 'event_id': event['id'],
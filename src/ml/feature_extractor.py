@@ -3,21 +3,328 @@ Feature extraction for behavioral monitoring.
 Extracts meaningful features from raw events for ML analysis.
 """
 
+import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Tuple
 import logging
+import re
+
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:  # Numba is optional; temporal flags are computed with NumPy instead
+    _NUMBA_AVAILABLE = False
+
+try:
+    import ahocorasick
+    _AHOCORASICK_AVAILABLE = True
+except ImportError:  # pyahocorasick is optional; categories are matched with regexes instead
+    _AHOCORASICK_AVAILABLE = False
+
+try:
+    import pyarrow  # noqa: F401
+    _STRING_DTYPE = 'string[pyarrow]'  # Contiguous Arrow buffers with vectorised string kernels
+except ImportError:  # PyArrow is optional; strings stay Python objects instead
+    _STRING_DTYPE = None
+
+# Application categories: an app belongs to a category if its lower-cased
+# name contains any of the category's tokens
+_APP_CATEGORY_TOKENS = {
+    # Enhanced categorize applications (more comprehensive)
+    'is_browser': ['firefox', 'chrome', 'chromium', 'safari', 'edge', 'opera', 'brave'],
+    'is_ide': ['code', 'pycharm', 'intellij', 'sublime', 'atom', 'vim', 'nano', 'emacs', 'geany'],
+    'is_terminal': ['terminal', 'bash', 'zsh', 'gnome-terminal', 'konsole', 'xterm', 'terminator'],
+    'is_media': ['vlc', 'spotify', 'youtube', 'music', 'video', 'totem', 'rhythmbox'],
+    'is_office': ['libreoffice', 'word', 'excel', 'powerpoint', 'calc', 'writer', 'impress'],
+    'is_social': ['discord', 'slack', 'telegram', 'whatsapp', 'teams', 'zoom', 'skype'],
+    'is_system': ['systemd', 'kernel', 'dbus', 'udev', 'pulseaudio', 'networkmanager'],
+    
+    # NEW: Security tool detection
+    'is_security_tool': ['nmap', 'wireshark', 'metasploit', 'burp', 'hydra', 'aircrack', 'john'],
+    
+    # NEW: Network tool detection
+    'is_network_tool': ['netcat', 'nc', 'ssh', 'telnet', 'ftp', 'wget', 'curl', 'ping'],
+    
+    # NEW: System admin tool detection
+    'is_admin_tool': ['sudo', 'su', 'gparted', 'systemctl', 'service', 'mount'],
+    
+    # NEW: Suspicious tool detection (Enhanced)
+    'is_suspicious_tool': ['keylog', 'rootkit', 'backdoor', 'trojan', 'virus', 'malware',
+                           'metasploit', 'armitage', 'beef', 'burp', 'sqlmap', 'nikto',
+                           'dirb', 'gobuster', 'hydra', 'john', 'hashcat', 'aircrack',
+                           'wireshark', 'ettercap', 'nessus', 'openvas', 'masscan',
+                           'zmap', 'responder', 'mimikatz', 'cobalt', 'empire'],
+    
+    # NEW: Browser-based security tool detection
+    'is_browser_security_tool': ['kali', 'parrot', 'blackarch', 'pentoo'],
+}
+
+_APP_CATEGORIES = list(_APP_CATEGORY_TOKENS)
+
+# One alternation per category, so each app name is scanned once per category
+_APP_CATEGORY_PATTERNS = [
+    re.compile('|'.join(map(re.escape, tokens)))
+    for tokens in _APP_CATEGORY_TOKENS.values()
+]
+
+if _AHOCORASICK_AVAILABLE:
+    # A single automaton over every category's tokens: one scan of an app
+    # name finds all the categories it belongs to
+    _token_categories = {}
+    for _index, _tokens in enumerate(_APP_CATEGORY_TOKENS.values()):
+        for _token in _tokens:
+            _token_categories.setdefault(_token, []).append(_index)
+    
+    _APP_CATEGORY_AUTOMATON = ahocorasick.Automaton()
+    for _token, _indices in _token_categories.items():
+        _APP_CATEGORY_AUTOMATON.add_word(_token, tuple(_indices))
+    _APP_CATEGORY_AUTOMATON.make_automaton()
+    del _token_categories, _index, _tokens, _token, _indices
+
+
+def _match_app_categories(app_names: List[str]) -> np.ndarray:
+    """Category membership (len(app_names) x len(_APP_CATEGORIES)) of lower-cased app names."""
+    flags = np.zeros((len(app_names), len(_APP_CATEGORIES)), dtype=bool)
+    
+    if _AHOCORASICK_AVAILABLE:
+        for row, app_name in enumerate(app_names):
+            for _, categories in _APP_CATEGORY_AUTOMATON.iter(app_name):
+                flags[row, categories] = True
+    else:
+        for column, pattern in enumerate(_APP_CATEGORY_PATTERNS):
+            flags[:, column] = [pattern.search(app_name) is not None for app_name in app_names]
+    
+    return flags
+
+# Metadata keys used as features, with the value assumed when a key is missing
+_METADATA_DEFAULTS = {
+    'cpu_percent': 0,
+    'memory_percent': 0,
+    'session_duration_minutes': 0,
+    
+    # NEW: Network-related features
+    'remote_ip': '',
+    'remote_port': 0,
+    'is_suspicious_ip': False,
+    'connection_count': 0,
+    'bytes_sent_rate': 0,
+    'bytes_recv_rate': 0,
+    
+    # NEW: App launch frequency features
+    'app_launch_count_hour': 0,
+    'app_launch_count_day': 0,
+    'is_unusual_app': False,
+    'is_high_frequency': False,
+    
+    # NEW: Security features
+    'risk_level': 'low',
+    'suspicious_keyword': '',
+    'launches_per_minute': 0,
+    'unique_ips': 0,
+    'port_type': '',
+}
+
+# Free-text metadata kept as strings (low-cardinality ones become categoricals)
+_STRING_METADATA_COLUMNS = ('remote_ip', 'suspicious_keyword')
+
+_RISK_LEVEL_CODES = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+_SUSPICIOUS_PORTS = {22, 23, 135, 139, 445, 1433, 3389, 5432}
+
+# Lookup table over the whole port range (64 KiB): suspicious ports are True
+_SUSPICIOUS_PORT_LUT = np.zeros(65536, dtype=bool)
+_SUSPICIOUS_PORT_LUT[list(_SUSPICIOUS_PORTS)] = True
+
+
+def _is_suspicious_port(ports: pd.Series) -> np.ndarray:
+    """Whether each remote port is one of _SUSPICIOUS_PORTS."""
+    if not pd.api.types.is_numeric_dtype(ports):
+        return ports.isin(_SUSPICIOUS_PORTS).to_numpy()  # Mixed/non-numeric values
+    
+    values = ports.to_numpy(dtype=np.float64, na_value=-1.0)
+    in_range = (values >= 0) & (values <= 65535) & (values == np.floor(values))
+    return in_range & _SUSPICIOUS_PORT_LUT[np.where(in_range, values, 0).astype(np.int64)]
+
+# Boolean time-of-day / day-of-week flags, in feature column order
+_TEMPORAL_FLAGS = (
+    'is_weekend', 'is_workday',
+    'is_morning', 'is_afternoon', 'is_evening', 'is_night',
+    'is_work_hours', 'is_very_late', 'is_very_early',
+    'is_highly_unusual_hour', 'is_unusual_weekend_work', 'is_unusual_weekday_night',
+)
+
+if _NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _temporal_kernel(minutes, hour, minute, weekday, flags):
+        """Fill the clock fields and _TEMPORAL_FLAGS rows from minutes since the epoch, in one pass."""
+        for i in range(minutes.shape[0]):
+            m = minutes[i]
+            h = (m // 60) % 24
+            wd = (m // 1440 + 3) % 7  # 1970-01-01 was a Thursday
+            hour[i] = h
+            minute[i] = m % 60
+            weekday[i] = wd
+            
+            is_weekday = wd < 5
+            is_day_shift = 9 <= h < 17
+            flags[0, i] = not is_weekday
+            flags[1, i] = is_weekday
+            flags[2, i] = 6 <= h < 12
+            flags[3, i] = 12 <= h < 18
+            flags[4, i] = 18 <= h < 22
+            flags[5, i] = h >= 22 or h < 6
+            flags[6, i] = is_weekday and is_day_shift
+            flags[7, i] = h >= 23 or h < 5
+            flags[8, i] = 5 <= h < 7
+            flags[9, i] = 2 <= h <= 4
+            flags[10, i] = not is_weekday and is_day_shift
+            flags[11, i] = is_weekday and h >= 23
+
+
+def _temporal_features(timestamps: pd.Series) -> Dict[str, np.ndarray]:
+    """Clock fields and time-period flags of each (parsed) timestamp."""
+    if _NUMBA_AVAILABLE and timestamps.dt.tz is None:
+        n = len(timestamps)
+        minutes = timestamps.to_numpy().astype('datetime64[m]').view(np.int64)
+        hour = np.empty(n, dtype=np.int32)
+        minute = np.empty(n, dtype=np.int32)
+        weekday = np.empty(n, dtype=np.int32)
+        flags = np.empty((len(_TEMPORAL_FLAGS), n), dtype=bool)
+        _temporal_kernel(minutes, hour, minute, weekday, flags)
+        
+        temporal = {'hour_of_day': hour, 'minute_of_hour': minute, 'day_of_week': weekday}
+        temporal.update(zip(_TEMPORAL_FLAGS, flags))
+        temporal.update(_cyclic_time_features(hour, weekday))
+        return temporal
+    
+    hour = timestamps.dt.hour.to_numpy()
+    weekday = timestamps.dt.weekday.to_numpy()
+    is_weekday = weekday < 5
+    is_day_shift = (hour >= 9) & (hour < 17)
+    
+    return {
+        # Time-based features
+        'hour_of_day': hour,
+        'minute_of_hour': timestamps.dt.minute.to_numpy(),
+        'day_of_week': weekday,
+        'is_weekend': ~is_weekday,
+        'is_workday': is_weekday,
+        
+        # Time period classifications
+        'is_morning': (hour >= 6) & (hour < 12),
+        'is_afternoon': (hour >= 12) & (hour < 18),
+        'is_evening': (hour >= 18) & (hour < 22),
+        'is_night': (hour >= 22) | (hour < 6),
+        
+        # Working hours classification (9-17 weekdays)
+        'is_work_hours': is_weekday & is_day_shift,
+        
+        # Late night / early morning flags
+        'is_very_late': (hour >= 23) | (hour < 5),
+        'is_very_early': (hour >= 5) & (hour < 7),
+        
+        # Enhanced unusual time detection
+        'is_highly_unusual_hour': np.isin(hour, [2, 3, 4]),  # Most unusual hours
+        'is_unusual_weekend_work': ~is_weekday & is_day_shift,  # Weekend work hours
+        'is_unusual_weekday_night': is_weekday & (hour >= 23),  # Late weekday activity
+        
+        **_cyclic_time_features(hour, weekday),
+    }
+
+
+def _cyclic_time_features(hour: np.ndarray, weekday: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Hour of day and day of week as points on a circle, so 23:00 sits next to
+    00:00 and Sunday next to Monday.
+    """
+    hour_angle = hour.astype(np.float32) * np.float32(np.pi / 12)
+    day_angle = weekday.astype(np.float32) * np.float32(2 * np.pi / 7)
+    return {
+        'hour_sin': np.sin(hour_angle),
+        'hour_cos': np.cos(hour_angle),
+        'day_sin': np.sin(day_angle),
+        'day_cos': np.cos(day_angle),
+    }
+
+# Event types counted by the network / security pattern features
+_NETWORK_EVENT_PATTERN = re.compile('network')
+_SECURITY_EVENT_PATTERN = re.compile('suspicious|high_frequency|flooding')
+
+# String columns with few distinct values, stored as pandas categoricals
+_CATEGORICAL_COLUMNS = ('app_name', 'event_type', 'risk_level', 'port_type')
+
+# Helper columns holding each event's time bucket during pattern extraction
+# (integer bucket numbers: minutes since the epoch // bucket length in minutes)
+_TIME_BUCKETS = {'_bucket_5min': 5, '_bucket_10min': 10, '_bucket_hour': 60}
+
+# Pattern pass outputs, set to 0 when the batch lacks the pass's inputs
+_NETWORK_PATTERN_COLUMNS = ['connections_per_hour', 'avg_bandwidth_5min',
+                            'suspicious_ip_count', 'unique_ports_per_hour']
+_SECURITY_PATTERN_COLUMNS = ['risk_escalation', 'security_tools_per_hour',
+                             'admin_tools_per_hour', 'app_diversity_10min']
 
 class FeatureExtractor:
     """Extract features from raw behavioral events for anomaly detection."""
     
+    # Events without a value for any of these keys cannot be featurized
+    _REQUIRED_FIELDS = ('id', 'timestamp', 'event_type')
+    
+    # Model input columns, in order; a saved model only fits this layout
+    ML_FEATURE_COLUMNS = (
+        # Time features: cyclic hour/day encodings (they subsume the
+        # time-of-day period flags) plus the work-schedule signals
+        'hour_sin', 'hour_cos', 'day_sin', 'day_cos',
+        'is_weekend', 'is_work_hours',
+        # Enhanced application category features
+        'is_browser', 'is_ide', 'is_terminal', 'is_media', 
+        'is_office', 'is_social', 'is_system', 'is_new_app',
+        # NEW security features
+        'is_security_tool', 'is_network_tool', 'is_admin_tool', 'is_suspicious_tool',
+        'app_rarity',
+        # Enhanced sequential features
+        'time_since_last', 'app_switched', 'apps_in_5min', 'events_in_hour',
+        # NEW network patterns
+        'network_events_in_5min', 'security_events_in_hour', 'connections_per_hour',
+        # NEW security patterns  
+        'risk_escalation', 'security_tools_per_hour', 'admin_tools_per_hour',
+        'app_diversity_10min',
+        # Enhanced metadata features
+        'cpu_percent', 'memory_percent', 'session_duration',
+        # NEW network features
+        'connection_count', 'bytes_sent_rate', 'bytes_recv_rate',
+        'suspicious_ip_count', 'unique_ports_per_hour', 'avg_bandwidth_5min',
+        # NEW app frequency features
+        'app_launch_count_hour', 'app_launch_count_day', 'launches_per_minute',
+        # NEW security features  
+        'risk_level_numeric', 'unique_ips',
+        # NEW pattern flags
+        'is_high_bandwidth', 'is_suspicious_port', 'is_high_frequency_app', 
+        'is_flooding_behavior', 'is_unusual_app', 'is_high_frequency'
+    )
+    
     def __init__(self):
-        # Track known applications for anomaly detection
-        self.known_applications = set()
+        # Usage count per application (the known applications), and their running total
+        self.app_usage_counts = {}
+        self._total_app_count = 0
+        
+        # Batches at least this large are featurized in chunks on a thread pool
+        self.parallel_min_events = 5000
+        self.n_threads = min(4, os.cpu_count() or 1)
         # Track normal usage patterns
         self.usage_patterns = {}
-        
+        # Patterns per (rows, first timestamp, last timestamp) fingerprint, with hit counts
+        self.patterns_cache_size = 16
+        self._patterns_cache = {}
+        self._patterns_hits = {}
+        
+    @property
+    def known_applications(self):
+        """Applications seen so far (lower-cased), as a live view of the usage counts."""
+        return self.app_usage_counts.keys()
+    
     def extract_event_features(self, events: List[Dict]) -> pd.DataFrame:
         """
         Extract features from a list of events.
@@ -31,189 +338,201 @@ class FeatureExtractor:
         if not events:
             return pd.DataFrame()
         
-        features = []
-        
-        for event in events:
-            try:
-                timestamp = pd.to_datetime(event['timestamp'])
-                
-                # Basic temporal features
-                feature_dict = {
-                    'event_id': event['id'],
-                    'timestamp': timestamp,
-                    'event_type': event['event_type'],
-                    'app_name': event.get('app_name', 'unknown'),
-                    
-                    # Time-based features
-                    'hour_of_day': timestamp.hour,
-                    'minute_of_hour': timestamp.minute,
-                    'day_of_week': timestamp.weekday(),
-                    'is_weekend': timestamp.weekday() >= 5,
-                    'is_workday': timestamp.weekday() < 5,
-                    
-                    # Time period classifications
-                    'is_morning': 6 <= timestamp.hour < 12,
-                    'is_afternoon': 12 <= timestamp.hour < 18,
-                    'is_evening': 18 <= timestamp.hour < 22,
-                    'is_night': timestamp.hour >= 22 or timestamp.hour < 6,
-                    
-                    # Working hours classification (9-17 weekdays)
-                    'is_work_hours': (timestamp.weekday() < 5 and 
-                                    9 <= timestamp.hour < 17),
-                    
-                    # Late night / early morning flags
-                    'is_very_late': timestamp.hour >= 23 or timestamp.hour < 5,
-                    'is_very_early': 5 <= timestamp.hour < 7,
-                    
-                    # Enhanced unusual time detection
-                    'is_highly_unusual_hour': timestamp.hour in [2, 3, 4],  # Most unusual hours
-                    'is_unusual_weekend_work': (timestamp.weekday() >= 5 and 
-                                              9 <= timestamp.hour < 17),  # Weekend work hours
-                    'is_unusual_weekday_night': (timestamp.weekday() < 5 and 
-                                                timestamp.hour >= 23),  # Late weekday activity
-                }
-                
-                # Application-specific features (enhanced sensitivity)
-                if event['app_name']:
-                    app_name = event['app_name'].lower()
-                    
-                    # Enhanced categorize applications (more comprehensive)
-                    feature_dict.update({
-                        'is_browser': any(browser in app_name for browser in 
-                                        ['firefox', 'chrome', 'chromium', 'safari', 'edge', 'opera', 'brave']),
-                        'is_ide': any(ide in app_name for ide in 
-                                    ['code', 'pycharm', 'intellij', 'sublime', 'atom', 'vim', 'nano', 'emacs', 'geany']),
-                        'is_terminal': any(term in app_name for term in 
-                                         ['terminal', 'bash', 'zsh', 'gnome-terminal', 'konsole', 'xterm', 'terminator']),
-                        'is_media': any(media in app_name for media in 
-                                      ['vlc', 'spotify', 'youtube', 'music', 'video', 'totem', 'rhythmbox']),
-                        'is_office': any(office in app_name for office in 
-                                       ['libreoffice', 'word', 'excel', 'powerpoint', 'calc', 'writer', 'impress']),
-                        'is_social': any(social in app_name for social in 
-                                       ['discord', 'slack', 'telegram', 'whatsapp', 'teams', 'zoom', 'skype']),
-                        'is_system': any(sys_app in app_name for sys_app in 
-                                       ['systemd', 'kernel', 'dbus', 'udev', 'pulseaudio', 'networkmanager']),
-                        
-                        # NEW: Security tool detection
-                        'is_security_tool': any(sec in app_name for sec in 
-                                              ['nmap', 'wireshark', 'metasploit', 'burp', 'hydra', 'aircrack', 'john']),
-                        
-                        # NEW: Network tool detection  
-                        'is_network_tool': any(net in app_name for net in 
-                                             ['netcat', 'nc', 'ssh', 'telnet', 'ftp', 'wget', 'curl', 'ping']),
-                        
-                        # NEW: System admin tool detection
-                        'is_admin_tool': any(admin in app_name for admin in 
-                                           ['sudo', 'su', 'gparted', 'systemctl', 'service', 'mount']),
-                        
-                        # NEW: Suspicious tool detection (Enhanced)
-                        'is_suspicious_tool': any(sus in app_name for sus in 
-                                                ['keylog', 'rootkit', 'backdoor', 'trojan', 'virus', 'malware',
-                                                 'metasploit', 'armitage', 'beef', 'burp', 'sqlmap', 'nikto',
-                                                 'dirb', 'gobuster', 'hydra', 'john', 'hashcat', 'aircrack',
-                                                 'wireshark', 'ettercap', 'nessus', 'openvas', 'masscan',
-                                                 'zmap', 'responder', 'mimikatz', 'cobalt', 'empire']),
-                        
-                        # NEW: Browser-based security tool detection
-                        'is_browser_security_tool': any(tool in app_name for tool in
-                                                       ['kali', 'parrot', 'blackarch', 'pentoo']),
-                    })
-                    
-                    # Enhanced new application detection
-                    feature_dict['is_new_app'] = app_name not in self.known_applications
-                    feature_dict['app_rarity'] = self._calculate_app_rarity(app_name)
-                    self.known_applications.add(app_name)
-                
-                # Enhanced metadata features (network & security)
-                metadata = event.get('metadata', {})
-                if isinstance(metadata, dict):
-                    feature_dict.update({
-                        'has_metadata': True,
-                        'cpu_percent': metadata.get('cpu_percent', 0),
-                        'memory_percent': metadata.get('memory_percent', 0),
-                        'session_duration': self._parse_duration(
-                            metadata.get('session_duration_minutes', 0)
-                        ),
-                        
-                        # NEW: Network-related features
-                        'remote_ip': metadata.get('remote_ip', ''),
-                        'remote_port': metadata.get('remote_port', 0),
-                        'is_suspicious_ip': metadata.get('is_suspicious_ip', False),
-                        'connection_count': metadata.get('connection_count', 0),
-                        'bytes_sent_rate': metadata.get('bytes_sent_rate', 0),
-                        'bytes_recv_rate': metadata.get('bytes_recv_rate', 0),
-                        
-                        # NEW: App launch frequency features
-                        'app_launch_count_hour': metadata.get('app_launch_count_hour', 0),
-                        'app_launch_count_day': metadata.get('app_launch_count_day', 0),
-                        'is_unusual_app': metadata.get('is_unusual_app', False),
-                        'is_high_frequency': metadata.get('is_high_frequency', False),
-                        
-                        # NEW: Security features
-                        'risk_level': metadata.get('risk_level', 'low'),
-                        'suspicious_keyword': metadata.get('suspicious_keyword', ''),
-                        'launches_per_minute': metadata.get('launches_per_minute', 0),
-                        'unique_ips': metadata.get('unique_ips', 0),
-                        'port_type': metadata.get('port_type', ''),
-                    })
-                    
-                    # Convert risk level to numeric
-                    risk_mapping = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
-                    feature_dict['risk_level_numeric'] = risk_mapping.get(
-                        feature_dict['risk_level'], 0
-                    )
-                    
-                    # Network pattern features
-                    feature_dict.update({
-                        'is_high_bandwidth': (feature_dict['bytes_sent_rate'] > 1024*1024 or 
-                                            feature_dict['bytes_recv_rate'] > 1024*1024),
-                        'is_suspicious_port': feature_dict['remote_port'] in {22, 23, 135, 139, 445, 1433, 3389, 5432},
-                        'is_high_frequency_app': feature_dict['app_launch_count_hour'] > 5,
-                        'is_flooding_behavior': feature_dict['launches_per_minute'] > 15,
-                    })
-                else:
-                    feature_dict['has_metadata'] = False
-                
-                features.append(feature_dict)
-                
-            except Exception as e:
-                logging.error(f"Error extracting features from event {event.get('id')}: {e}")
-                continue
-        
-        df = pd.DataFrame(features)
+        df = self._build_feature_frame(events)
         
         # Add sequential features (enhanced)
         if len(df) > 1:
             df = self._add_sequential_features(df)
-            df = self._add_network_patterns(df)
-            df = self._add_security_patterns(df)
+            
+            # Metadata columns only exist if some event carried metadata, and app
+            # category columns if some event named an application
+            has_metadata = 'risk_level_numeric' in df.columns
+            if has_metadata:
+                df = self._add_network_patterns(df)
+            else:
+                df[_NETWORK_PATTERN_COLUMNS] = 0
+            if has_metadata or 'is_security_tool' in df.columns:
+                df = self._add_security_patterns(df)
+            else:
+                df[_SECURITY_PATTERN_COLUMNS] = 0
+            df = df.drop(columns=list(_TIME_BUCKETS))
         
         return df
     
-    def _calculate_app_rarity(self, app_name):
-        """Calculate how rare/common an application is (0=common, 1=very rare)."""
-        if not hasattr(self, 'app_usage_counts'):
-            self.app_usage_counts = {}
+    def extract_single_event_features(self, event: Dict) -> Dict[str, Any]:
+        """
+        Extract the per-event (non-sequential) features of one event.
         
-        self.app_usage_counts[app_name] = self.app_usage_counts.get(app_name, 0) + 1
+        Args:
+            event: Event dictionary from database
+            
+        Returns:
+            Feature dictionary for the event
+        """
+        df = self._build_feature_frame([event])
+        if df.empty:
+            raise ValueError(f"Could not extract features from event {event.get('id')}")
+        
+        return df.iloc[0].to_dict()
+    
+    def _build_feature_frame(self, events: List[Dict]) -> pd.DataFrame:
+        """Build the per-event (non-sequential) feature columns for a batch of events."""
+        valid_events = [event for event in events
+                        if all(event.get(field) is not None for field in self._REQUIRED_FIELDS)]
+        if len(valid_events) < len(events):
+            logging.error(f"Skipping {len(events) - len(valid_events)} events without one of {self._REQUIRED_FIELDS}")
+        if not valid_events:
+            return pd.DataFrame()
         
-        # Calculate rarity based on usage frequency
-        total_apps = sum(self.app_usage_counts.values())
-        app_frequency = self.app_usage_counts[app_name] / max(total_apps, 1)
+        # The per-event features are independent, so large batches are split
+        # across threads; the in-order app usage state is applied afterwards
+        if len(valid_events) >= self.parallel_min_events and self.n_threads > 1:
+            chunk_size = -(-len(valid_events) // self.n_threads)
+            chunks = [valid_events[i:i + chunk_size] for i in range(0, len(valid_events), chunk_size)]
+            with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+                frames = list(executor.map(self._extract_chunk, chunks))
+            features = pd.concat(frames, ignore_index=True)
+        else:
+            features = self._extract_chunk(valid_events)
+        
+        app_lower = self._lower_app_names(features['app_name'])
+        if len(app_lower):
+            usage = self._app_usage_features(app_lower, *pd.factorize(app_lower))
+            position = features.columns.get_loc(_APP_CATEGORIES[-1]) + 1
+            for offset, column in enumerate(usage.columns):
+                features.insert(position + offset, column, usage[column])
+        
+        # Low-cardinality strings: groupby/nunique/comparisons then work on integer codes
+        for column in _CATEGORICAL_COLUMNS:
+            if column in features.columns:
+                features[column] = features[column].astype('category')
+        
+        return features
+    
+    def _extract_chunk(self, events: List[Dict]) -> pd.DataFrame:
+        """Stateless per-event features (temporal, app category, metadata) of validated events."""
+        df = pd.DataFrame(events)
+        if 'app_name' not in df.columns:
+            df['app_name'] = None  # No event names an application
+        timestamps = pd.to_datetime(df['timestamp'], format='mixed', errors='coerce')
+        valid = timestamps.notna().to_numpy()
+        if not valid.all():
+            logging.error(f"Skipping {int((~valid).sum())} events with unparseable timestamps")
+        
+        # An event without a metadata key has empty metadata (unlike an explicit None)
+        metadata = [event.get('metadata', {}) for event, ok in zip(events, valid) if ok]
+        df = df[valid].reset_index(drop=True)
+        timestamps = timestamps[valid].reset_index(drop=True)
+        
+        # Basic temporal features
+        features = pd.DataFrame({
+            'event_id': df['id'],
+            'timestamp': timestamps,
+            'event_type': df['event_type'],
+            'app_name': df['app_name'],
+            **_temporal_features(timestamps),
+        })
+        
+        # Application-specific features, only for events that name an application
+        app_lower = self._lower_app_names(df['app_name'])
+        
+        parts = [features]
+        if len(app_lower):
+            # Categories only depend on the name, so match each distinct app once
+            codes, apps = pd.factorize(app_lower)
+            parts.append(pd.DataFrame(_match_app_categories(apps.tolist())[codes],
+                                      columns=_APP_CATEGORIES, index=app_lower.index))
+        parts.append(self._metadata_frame(metadata))
+        
+        return pd.concat(parts, axis=1)
+    
+    @staticmethod
+    def _lower_app_names(app_names: pd.Series) -> pd.Series:
+        """Lower-cased names of the events that name an application."""
+        named = app_names[app_names.notna() & (app_names != '')]
+        return named.astype(_STRING_DTYPE or str).str.lower()
+    
+    def _metadata_frame(self, metadata: List[Any]) -> pd.DataFrame:
+        """Network & security features from each event's metadata, in one pass over the batch."""
+        has_metadata = np.fromiter((isinstance(m, dict) for m in metadata), dtype=bool, count=len(metadata))
+        features = pd.DataFrame({'has_metadata': has_metadata})
+        if not has_metadata.any():
+            return features
+        
+        # Object dtype keeps integer columns integral while missing keys get their defaults
+        rows = [m for m in metadata if isinstance(m, dict)]
+        meta = pd.DataFrame(rows, index=np.flatnonzero(has_metadata),
+                            columns=list(_METADATA_DEFAULTS), dtype=object)
+        meta = meta.fillna(_METADATA_DEFAULTS).infer_objects()
+        if _STRING_DTYPE:
+            for column in _STRING_METADATA_COLUMNS:
+                meta[column] = meta[column].astype(_STRING_DTYPE)
+        
+        meta.insert(2, 'session_duration', pd.to_numeric(
+            meta.pop('session_duration_minutes'), errors='coerce'
+        ).fillna(0.0).astype(float))
+        
+        # Convert risk level to numeric (0-3 fits in int8)
+        meta['risk_level_numeric'] = meta['risk_level'].map(_RISK_LEVEL_CODES).fillna(0).astype(np.int8)
+        
+        # Network pattern features
+        def numeric(column):
+            return pd.to_numeric(meta[column], errors='coerce')
+        
+        meta['is_high_bandwidth'] = (numeric('bytes_sent_rate') > 1024*1024) | (numeric('bytes_recv_rate') > 1024*1024)
+        meta['is_suspicious_port'] = _is_suspicious_port(meta['remote_port'])
+        meta['is_high_frequency_app'] = numeric('app_launch_count_hour') > 5
+        meta['is_flooding_behavior'] = numeric('launches_per_minute') > 15
+        
+        return pd.concat([features, meta], axis=1)
+    
+    def _app_usage_features(self, app_lower: pd.Series, codes: np.ndarray, apps: pd.Index) -> pd.DataFrame:
+        """
+        New-application and rarity features, as if the apps were seen one after another.
         
-        # Convert frequency to rarity (inverse)
-        if app_frequency > 0.1:  # Very common (>10% of usage)
-            return 0.1
-        elif app_frequency > 0.05:  # Common (>5% of usage)
-            return 0.3
-        elif app_frequency > 0.01:  # Uncommon (>1% of usage)
-            return 0.6
-        else:  # Rare (<1% of usage)
-            return 1.0
+        Each event's rarity uses the usage counts up to and including that event,
+        so the running counts are rebuilt from cumulative counts within the batch.
+        """
+        prior_counts = np.array([self.app_usage_counts.get(app, 0) for app in apps], dtype=np.int64)
+        batch_counts = np.bincount(codes, minlength=len(apps))
+        
+        # Usage count of each event's app, and of all apps, right after that event
+        seen_in_batch = pd.Series(codes).groupby(codes).cumcount().to_numpy() + 1
+        app_count = prior_counts[codes] + seen_in_batch
+        total_apps = self._total_app_count + np.arange(1, len(codes) + 1)
+        app_frequency = app_count / np.maximum(total_apps, 1)
+        
+        # Convert frequency to rarity (inverse): very common (>10% of usage),
+        # common (>5%), uncommon (>1%), rare (<1%)
+        app_rarity = np.select(
+            [app_frequency > 0.1, app_frequency > 0.05, app_frequency > 0.01],
+            [0.1, 0.3, 0.6],
+            default=1.0
+        )
+        
+        # Enhanced new application detection
+        first_seen = np.zeros(len(codes), dtype=bool)
+        first_seen[np.unique(codes, return_index=True)[1]] = True
+        is_new_app = (prior_counts == 0)[codes] & first_seen
+        
+        for app, prior, count in zip(apps, prior_counts.tolist(), batch_counts.tolist()):
+            self.app_usage_counts[app] = prior + count
+        self._total_app_count += len(codes)
+        
+        return pd.DataFrame({'is_new_app': is_new_app, 'app_rarity': app_rarity}, index=app_lower.index)
     
     def _add_sequential_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Add features based on sequences and patterns."""
-        df = df.sort_values('timestamp').copy()
+        # sort_values returns a new frame, so the pattern passes below can add columns in place
+        df = df.sort_values('timestamp')
+        
+        # Time buckets shared by all the windowed pattern features
+        timestamps = df['timestamp']
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_localize(None)  # Bucket on wall-clock time, like dt.floor
+        minutes = timestamps.to_numpy().astype('datetime64[m]').view(np.int64)
+        for column, bucket_minutes in _TIME_BUCKETS.items():
+            df[column] = minutes // bucket_minutes
         
         # Time between events
         df['time_since_last'] = df['timestamp'].diff().dt.total_seconds() / 60  # minutes
@@ -223,83 +542,106 @@ class FeatureExtractor:
         df['app_switched'] = (df['app_name'] != df['app_name'].shift(1)).astype(int)
         
         # Rapid application launching (multiple apps in short time)
-        df['apps_in_5min'] = df.groupby(
-            df['timestamp'].dt.floor('5min')
-        )['app_name'].transform('nunique')
+        df['apps_in_5min'] = self._distinct_per_bucket(df, '_bucket_5min', 'app_name')
         
-        # Session patterns (enhanced)
-        df['events_in_hour'] = df.groupby(
-            [df['timestamp'].dt.floor('h'), 'event_type']  # Fixed deprecation warning
-        ).transform('size')
+        # Session patterns (enhanced): events of the same type in the same hour
+        groups = df.groupby(['_bucket_hour', 'event_type'], sort=False, dropna=False).ngroup().to_numpy()
+        df['events_in_hour'] = np.bincount(groups)[groups]
         
-        # NEW: Network connection patterns
-        df['network_events_in_5min'] = df[df['event_type'].str.contains('network', na=False)].groupby(
-            df['timestamp'].dt.floor('5min')
-        ).transform('size').fillna(0)
+        # NEW: Network connection patterns (only set on network events)
+        network = self._event_type_matches(df['event_type'], _NETWORK_EVENT_PATTERN)
+        df['network_events_in_5min'] = self._count_per_bucket(df.loc[network, '_bucket_5min'])
         
-        # NEW: Security event patterns
-        df['security_events_in_hour'] = df[df['event_type'].str.contains('suspicious|high_frequency|flooding', na=False)].groupby(
-            df['timestamp'].dt.floor('h')
-        ).transform('size').fillna(0)
+        # NEW: Security event patterns (only set on security events)
+        security = self._event_type_matches(df['event_type'], _SECURITY_EVENT_PATTERN)
+        df['security_events_in_hour'] = self._count_per_bucket(df.loc[security, '_bucket_hour'])
         
         return df
     
+    @staticmethod
+    def _event_type_matches(event_types: pd.Series, pattern: re.Pattern) -> pd.Series:
+        """Rows whose event type matches the pattern (tested once per distinct type)."""
+        matching = [event_type for event_type in event_types.unique()
+                    if isinstance(event_type, str) and pattern.search(event_type)]
+        return event_types.isin(matching)
+    
+    @staticmethod
+    def _count_per_bucket(buckets: pd.Series) -> pd.Series:
+        """Number of rows sharing each row's time bucket."""
+        return buckets.map(buckets.value_counts())
+    
+    @staticmethod
+    def _distinct_per_bucket(df: pd.DataFrame, bucket: str, column: str) -> pd.Series:
+        """Number of distinct values of a column within each row's time bucket."""
+        return df[bucket].map(df.groupby(bucket)[column].nunique())
+    
     def _add_network_patterns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Add network-specific pattern features."""
-        df = df.copy()
-        
         # Network connection frequency
-        df['connections_per_hour'] = df.groupby(
-            df['timestamp'].dt.floor('h')
-        )['connection_count'].transform('sum')
+        df['connections_per_hour'] = df.groupby('_bucket_hour')['connection_count'].transform('sum')
         
         # Bandwidth usage patterns
-        df['avg_bandwidth_5min'] = (df['bytes_sent_rate'] + df['bytes_recv_rate']).rolling(
-            window=5, min_periods=1
-        ).mean()
+        bandwidth = (df['bytes_sent_rate'] + df['bytes_recv_rate']).to_numpy(dtype=float, na_value=np.nan)
+        df['avg_bandwidth_5min'] = self._trailing_mean(bandwidth, window=5)
         
         # Suspicious IP patterns
-        df['suspicious_ip_count'] = df.groupby(
-            df['timestamp'].dt.floor('10min')
-        )['is_suspicious_ip'].transform('sum')
+        df['suspicious_ip_count'] = df.groupby('_bucket_10min')['is_suspicious_ip'].transform('sum')
         
         # Port usage patterns
-        df['unique_ports_per_hour'] = df.groupby(
-            df['timestamp'].dt.floor('h')
-        )['remote_port'].transform('nunique')
+        df['unique_ports_per_hour'] = self._distinct_per_bucket(df, '_bucket_hour', 'remote_port')
         
         return df
     
+    @staticmethod
+    def _trailing_mean(values: np.ndarray, window: int) -> np.ndarray:
+        """
+        Mean of the non-NaN values among each row and the window-1 rows before it
+        (rolling(window, min_periods=1).mean()), from running sums and counts.
+        """
+        valid = ~np.isnan(values)
+        sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+        counts = np.concatenate(([0], np.cumsum(valid)))
+        
+        end = np.arange(1, len(values) + 1)
+        start = np.maximum(end - window, 0)
+        window_counts = counts[end] - counts[start]
+        
+        means = np.full(len(values), np.nan)
+        np.divide(sums[end] - sums[start], window_counts, out=means, where=window_counts > 0)
+        return means
+    
     def _add_security_patterns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Add security-specific pattern features."""
-        df = df.copy()
-        
         # Risk escalation patterns
-        df['risk_escalation'] = (df['risk_level_numeric'] > df['risk_level_numeric'].shift(1)).astype(int)
-        
-        # Suspicious tool usage frequency
-        df['security_tools_per_hour'] = df.groupby(
-            df['timestamp'].dt.floor('h')
-        )['is_security_tool'].transform('sum')
-        
-        # Admin tool usage patterns
-        df['admin_tools_per_hour'] = df.groupby(
-            df['timestamp'].dt.floor('h')
-        )['is_admin_tool'].transform('sum')
+        escalation = np.zeros(len(df), dtype=int)
+        if 'risk_level_numeric' in df.columns:
+            escalation[1:] = np.diff(df['risk_level_numeric'].to_numpy()) > 0
+        df['risk_escalation'] = escalation
+        
+        if 'is_security_tool' in df.columns:
+            # Suspicious tool usage frequency
+            df['security_tools_per_hour'] = df.groupby('_bucket_hour')['is_security_tool'].transform('sum')
+            
+            # Admin tool usage patterns
+            df['admin_tools_per_hour'] = df.groupby('_bucket_hour')['is_admin_tool'].transform('sum')
+        else:
+            df['security_tools_per_hour'] = 0
+            df['admin_tools_per_hour'] = 0
         
         # Application diversity (more apps = potentially more suspicious)
-        df['app_diversity_10min'] = df.groupby(
-            df['timestamp'].dt.floor('10min')
-        )['app_name'].transform('nunique')
+        df['app_diversity_10min'] = self._distinct_per_bucket(df, '_bucket_10min', 'app_name')
         
         return df
     
-    def _parse_duration(self, duration_value: Any) -> float:
-        """Parse duration value safely."""
-        try:
-            return float(duration_value)
-        except (TypeError, ValueError):
-            return 0.0
+    @staticmethod
+    def _value_counts(values: pd.Series) -> pd.Series:
+        """
+        value_counts() of the values as plain objects: a categorical would also
+        report absent categories and break count ties by category order.
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        return values.value_counts()
     
     def extract_usage_patterns(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -314,6 +656,13 @@ class FeatureExtractor:
         if df.empty:
             return {}
         
+        # Patterns only change when the data does: reuse them for the same frame
+        key = (len(df), df['timestamp'].min().value, df['timestamp'].max().value)
+        if key in self._patterns_cache:
+            self._patterns_hits[key] += 1
+            self.usage_patterns = self._patterns_cache[key]
+            return self.usage_patterns
+        
         patterns = {}
         
         try:
@@ -324,27 +673,33 @@ class FeatureExtractor:
             
             # Most common applications
             if 'app_name' in df.columns:
-                app_counts = df[df['app_name'] != 'unknown']['app_name'].value_counts()
+                app_counts = self._value_counts(df[df['app_name'] != 'unknown']['app_name'])
                 patterns['common_apps'] = app_counts.head(10).index.tolist()
                 patterns['rare_apps'] = app_counts.tail(5).index.tolist()
                 
-                # Application usage by time
-                patterns['apps_by_hour'] = {}
-                for hour in range(24):
-                    hour_apps = df[df['hour_of_day'] == hour]['app_name'].value_counts().head(3).index.tolist()
-                    patterns['apps_by_hour'][hour] = hour_apps
+                # Application usage by time: one grouping pass; each hour's apps
+                # are in first-seen order, ranked exactly like value_counts()
+                app_names = df['app_name']
+                if isinstance(app_names.dtype, pd.CategoricalDtype):
+                    app_names = app_names.astype(object)
+                hour_app_counts = df.groupby([df['hour_of_day'], app_names], sort=False).size()
+                apps_by_hour = {
+                    hour: counts.droplevel(0).sort_values(ascending=False, kind='stable').head(3).index.tolist()
+                    for hour, counts in hour_app_counts.groupby(level=0, sort=False)
+                }
+                patterns['apps_by_hour'] = {hour: apps_by_hour.get(hour, []) for hour in range(24)}
             
             # Weekend vs weekday patterns
             patterns['weekend_usage'] = {
                 'event_count': len(df[df['is_weekend']]),
                 'common_hours': df[df['is_weekend']]['hour_of_day'].value_counts().head(5).index.tolist(),
-                'common_apps': df[df['is_weekend']]['app_name'].value_counts().head(5).index.tolist()
+                'common_apps': self._value_counts(df[df['is_weekend']]['app_name']).head(5).index.tolist()
             }
             
             patterns['weekday_usage'] = {
                 'event_count': len(df[~df['is_weekend']]),
                 'common_hours': df[~df['is_weekend']]['hour_of_day'].value_counts().head(5).index.tolist(),
-                'common_apps': df[~df['is_weekend']]['app_name'].value_counts().head(5).index.tolist()
+                'common_apps': self._value_counts(df[~df['is_weekend']]['app_name']).head(5).index.tolist()
             }
             
             # Activity intensity patterns
@@ -367,6 +722,7 @@ class FeatureExtractor:
             
             # Update internal patterns for anomaly detection
             self.usage_patterns = patterns
+            self._cache_patterns(key, patterns)
             
         except Exception as e:
             logging.error(f"Error extracting usage patterns: {e}")
@@ -374,6 +730,15 @@ class FeatureExtractor:
         
         return patterns
     
+    def _cache_patterns(self, key: Tuple, patterns: Dict[str, Any]):
+        """Remember patterns for a frame fingerprint, evicting the least used entry when full."""
+        if len(self._patterns_cache) >= self.patterns_cache_size:
+            least_used = min(self._patterns_hits, key=self._patterns_hits.get)
+            del self._patterns_cache[least_used], self._patterns_hits[least_used]
+        
+        self._patterns_cache[key] = patterns
+        self._patterns_hits[key] = 0
+    
     def prepare_features_for_ml(self, df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
         """
         Prepare features for machine learning model.
@@ -387,66 +752,17 @@ class FeatureExtractor:
         if df.empty:
             return np.array([]), []
         
-        # Select numerical and categorical features for ML (enhanced)
-        ml_features = [
-            # Time features
-            'hour_of_day', 'day_of_week', 'is_weekend', 'is_workday',
-            'is_morning', 'is_afternoon', 'is_evening', 'is_night',
-            'is_work_hours', 'is_very_late', 'is_very_early',
-        ]
-        
-        # Enhanced application category features
-        app_features = [
-            'is_browser', 'is_ide', 'is_terminal', 'is_media', 
-            'is_office', 'is_social', 'is_system', 'is_new_app',
-            # NEW security features
-            'is_security_tool', 'is_network_tool', 'is_admin_tool', 'is_suspicious_tool',
-            'app_rarity'
-        ]
-        
-        for feature in app_features:
-            if feature in df.columns:
-                ml_features.append(feature)
-        
-        # Enhanced sequential features
-        seq_features = [
-            'time_since_last', 'app_switched', 'apps_in_5min', 'events_in_hour',
-            # NEW network patterns
-            'network_events_in_5min', 'security_events_in_hour', 'connections_per_hour',
-            # NEW security patterns  
-            'risk_escalation', 'security_tools_per_hour', 'admin_tools_per_hour',
-            'app_diversity_10min'
-        ]
-        for feature in seq_features:
-            if feature in df.columns:
-                ml_features.append(feature)
-        
-        # Enhanced metadata features
-        meta_features = [
-            'cpu_percent', 'memory_percent', 'session_duration',
-            # NEW network features
-            'connection_count', 'bytes_sent_rate', 'bytes_recv_rate',
-            'suspicious_ip_count', 'unique_ports_per_hour', 'avg_bandwidth_5min',
-            # NEW app frequency features
-            'app_launch_count_hour', 'app_launch_count_day', 'launches_per_minute',
-            # NEW security features  
-            'risk_level_numeric', 'unique_ips',
-            # NEW pattern flags
-            'is_high_bandwidth', 'is_suspicious_port', 'is_high_frequency_app', 
-            'is_flooding_behavior', 'is_unusual_app', 'is_high_frequency'
-        ]
-        for feature in meta_features:
-            if feature in df.columns:
-                ml_features.append(feature)
-        
-        # Filter features that exist in DataFrame
-        available_features = [f for f in ml_features if f in df.columns]
+        # ML columns in their fixed order, skipping any this batch did not produce
+        available_features = [f for f in self.ML_FEATURE_COLUMNS if f in df.columns]
         
         if not available_features:
             return np.array([]), []
         
-        # Extract feature matrix
-        X = df[available_features].fillna(0).astype(float).values
+        # Extract feature matrix: filled column by column into one float32
+        # array (missing values count as 0), without intermediate frames
+        X = np.empty((len(df), len(available_features)), dtype=np.float32)
+        for i, feature in enumerate(available_features):
+            X[:, i] = df[feature].to_numpy(dtype=np.float32, na_value=0.0)
         
         return X, available_features
     
@@ -9,26 +9,151 @@ import sys
 import time
 import psutil
 import logging
+import re
 import threading
+import queue
 import subprocess
+import functools
+from itertools import islice, takewhile
+from collections import Counter, deque
 from datetime import datetime
-from typing import Dict, Set, Optional
+from typing import Dict, Set, Optional, NamedTuple
 from pathlib import Path
 
 # Import from parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.core.database import BehaviorDatabase
 
+# Process names that are never reported as applications
+_SYSTEM_PROCESSES = frozenset({'systemd', 'kthreadd', 'ksoftirqd', 'migration', 'rcu_', 'watchdog'})
+
+# Command line parts naming a GUI application
+_GUI_HINTS_RE = re.compile('firefox|chrome|code|terminal|nautilus|gedit')
+
+# Keywords marking a suspicious application; earlier keywords take precedence
+_SUSPICIOUS_KEYWORDS = (
+    # Network tools
+    'netcat', 'ncat', 'nc', 'nmap', 'masscan', 'zmap', 'wireshark', 'tcpdump',
+    # Remote access
+    'ssh', 'telnet', 'vnc', 'rdp', 'teamviewer', 'anydesk',
+    # Security tools  
+    'metasploit', 'burp', 'sqlmap', 'nikto', 'dirb', 'gobuster', 'ffuf',
+    # Password tools
+    'hashcat', 'john', 'hydra', 'medusa', 'crunch',
+    # Wireless
+    'aircrack', 'kismet', 'wifite', 'reaver',
+    # Keyloggers/malware
+    'keylog', 'rootkit', 'backdoor', 'trojan',
+    # Tor/anonymity
+    'tor', 'proxychains', 'torsocks',
+    # Privilege escalation
+    'sudo', 'su', 'pkexec', 'doas'
+)
+_SUSPICIOUS_KEYWORD_ORDER = {keyword: index for index, keyword in enumerate(_SUSPICIOUS_KEYWORDS)}
+
+# Lookahead finds every keyword start, so overlapping keywords are all reported
+_SUSPICIOUS_KEYWORD_RE = re.compile('(?=(' + '|'.join(map(re.escape, _SUSPICIOUS_KEYWORDS)) + '))')
+
+# Suspicious application combinations: two or more keywords among the recent launches
+_SUSPICIOUS_COMBINATIONS = (
+    ['terminal', 'browser', 'file'],  # Potential data exfiltration
+    ['ssh', 'scp', 'rsync'],  # Remote file transfer
+    ['netcat', 'nmap', 'wireshark'],  # Network reconnaissance
+    ['python', 'curl', 'wget'],  # Script-based downloading
+    ['bash', 'nc', 'python'],  # Potential reverse shell
+    ['vim', 'nano', 'systemd'],  # System file editing
+)
+
+# No combination keyword is a prefix of another, so each match start names one keyword
+_COMBINATION_KEYWORD_RE = re.compile('(?=(' + '|'.join(
+    map(re.escape, sorted({keyword for keywords in _SUSPICIOUS_COMBINATIONS for keyword in keywords}))
+) + '))')
+
+# Most events the writer thread commits in one transaction
+_EVENT_BATCH_SIZE = 64
+
+# Network checks back off (doubling) after this many checks without new connections,
+# from _NETWORK_CHECK_INTERVAL up to _MAX_NETWORK_CHECK_INTERVAL seconds
+_NETWORK_CHECK_INTERVAL = 1.0
+_MAX_NETWORK_CHECK_INTERVAL = 4.0
+_IDLE_NETWORK_CHECKS = 5
+
+# Common attack ports
+_SUSPICIOUS_PORTS = frozenset({22, 23, 135, 139, 445, 1433, 3389, 5432})
+
+_SUSPICIOUS_RISK_LEVELS = {
+    **dict.fromkeys(['keylog', 'rootkit', 'backdoor', 'trojan'], 'critical'),
+    **dict.fromkeys(['metasploit', 'hydra', 'aircrack'], 'high'),
+}
+
+_SUSPICIOUS_CATEGORIES = {
+    'network_recon': ['nmap', 'masscan', 'zmap', 'nikto', 'dirb'],
+    'network_tools': ['netcat', 'ncat', 'nc', 'wireshark', 'tcpdump'],
+    'remote_access': ['ssh', 'telnet', 'vnc', 'rdp'],
+    'exploit_tools': ['metasploit', 'burp', 'sqlmap'],
+    'password_attack': ['hashcat', 'john', 'hydra', 'medusa'],
+    'wireless_attack': ['aircrack', 'kismet', 'wifite'],
+    'malware': ['keylog', 'rootkit', 'backdoor', 'trojan'],
+    'anonymity': ['tor', 'proxychains', 'torsocks'],
+    'privilege_esc': ['sudo', 'su', 'pkexec']
+}
+_CATEGORY_BY_KEYWORD = {keyword: category
+                        for category, keywords in reversed(_SUSPICIOUS_CATEGORIES.items())
+                        for keyword in keywords}
+
+class AppLaunchEvent(NamedTuple):
+    """Metadata of an application launch, serialized only when the writer thread stores it."""
+    session_id: str
+    hour_of_day: int
+    weekday: int
+    pid: int
+    cmdline: str
+    create_time: str
+    cpu_percent: float
+    memory_percent: float
+    app_launch_count_hour: int
+    app_launch_count_day: int
+    is_unusual_app: bool
+    is_high_frequency: bool
+    
+    def to_metadata(self) -> Dict:
+        """Event metadata dictionary, as stored in the events table."""
+        return {
+            'session_id': self.session_id,
+            'hour_of_day': self.hour_of_day,
+            'weekday': self.weekday,
+            'is_weekend': self.weekday >= 5,
+            'pid': self.pid,
+            'cmdline': self.cmdline,
+            'create_time': self.create_time,
+            'cpu_percent': self.cpu_percent,
+            'memory_percent': self.memory_percent,
+            'app_launch_count_hour': self.app_launch_count_hour,
+            'app_launch_count_day': self.app_launch_count_day,
+            'is_unusual_app': self.is_unusual_app,
+            'is_high_frequency': self.is_high_frequency
+        }
+
+@functools.lru_cache(maxsize=512)
+def _normalize_app_name(app_name: str) -> str:
+    """Lower-cased app name; the same few apps are launched over and over."""
+    return app_name.lower()
+
 class EventCollector:
     """Lightweight event collector for system behavioral monitoring."""
     
     def __init__(self):
         self.running = False
+        self._stop_event = threading.Event()  # Set by stop(); wakes the collection loop at once
         self.session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
         self.session_start_time = datetime.now()
         self.db = BehaviorDatabase()
         self.collector_thread = None
         
+        # Events are written by a background thread, in batches of up to _EVENT_BATCH_SIZE
+        self._event_queue = queue.SimpleQueue()
+        self.writer_thread = None
+        
         # Initialize tracking sets
         self.known_processes = set()
         self.known_applications = set()
@@ -42,14 +167,18 @@ class EventCollector:
         # Network monitoring state
         self.network_baseline = {}
         self.app_network_usage = {}
-        self.connection_history = []
+        self.connection_history = deque(maxlen=2048)  # Connections of the last 5 minutes
+        self._recent_connection_keys = set()  # Keys of the last 50 logged connections
+        self._recent_keys_order = deque(maxlen=50)
         self.suspicious_ips = set()
         self.last_network_check = time.time()
-        self.network_check_interval = 1.0  # Check network every second
+        self.network_check_interval = _NETWORK_CHECK_INTERVAL  # Check network every second
+        self._known_connections = set()  # (remote_ip, remote_port, local_port) at the last check
+        self._idle_network_checks = 0
         
         # Application launch tracking
         self.app_launch_counts = {}
-        self.app_launch_history = []
+        self.app_launch_history = deque(maxlen=512)  # Launches of the last 10 minutes
         self.unusual_apps = set()
         
         # Request pattern tracking
@@ -59,6 +188,9 @@ class EventCollector:
         # Initialize known processes
         self._initialize_known_processes()
         
+        # Prime the CPU counters so non-blocking cpu_percent() calls return real readings
+        psutil.cpu_percent(interval=None)
+        
         logging.info(f"Event collector initialized with session ID: {self.session_id}")
     
     def _generate_session_id(self) -> str:
@@ -68,6 +200,10 @@ class EventCollector:
     def _initialize_known_processes(self):
         """Initialize the set of currently running processes."""
         try:
+            if sys.platform.startswith('linux'):
+                self._initialize_known_processes_from_proc()
+                return
+            
             for proc in psutil.process_iter(['pid', 'name']):
                 try:
                     self.known_processes.add(proc.info['pid'])
@@ -78,15 +214,34 @@ class EventCollector:
         except Exception as e:
             logging.error(f"Error initializing known processes: {e}")
     
-    def _get_application_name(self, proc) -> Optional[str]:
-        """Extract meaningful application name from process."""
+    def _initialize_known_processes_from_proc(self):
+        """Linux fast path: PIDs from the /proc listing and names from /proc/<pid>/comm."""
+        for entry in os.scandir('/proc'):
+            if not entry.name.isdigit():
+                continue
+            pid = int(entry.name)
+            try:
+                with open(f'/proc/{pid}/comm') as comm:
+                    name = comm.read().rstrip('\n')
+                # comm is cut to 15 characters; psutil recovers the full name from the cmdline
+                if len(name) >= 15:
+                    name = psutil.Process(pid).name()
+            except (OSError, psutil.NoSuchProcess, psutil.AccessDenied):
+                continue  # Exited while scanning
+            
+            self.known_processes.add(pid)
+            if name:
+                self.known_applications.add(name)
+    
+    def _get_application_name(self, info: Dict) -> Optional[str]:
+        """Extract meaningful application name from a process's info dict."""
         try:
-            name = proc.info['name']
+            name = info['name']
             if not name:
                 return None
                 
             # Filter out system processes and get meaningful names
-            if name in ['systemd', 'kthreadd', 'ksoftirqd', 'migration', 'rcu_', 'watchdog']:
+            if name in _SYSTEM_PROCESSES:
                 return None
             
             # Clean up common patterns
@@ -94,17 +249,12 @@ class EventCollector:
                 return name[:-3]
             
             # Get more detailed info for GUI applications
-            try:
-                cmdline = proc.info.get('cmdline', [])
-                if cmdline and len(cmdline) > 0:
-                    # Look for common application patterns
-                    for cmd_part in cmdline:
-                        if any(gui_hint in cmd_part.lower() for gui_hint in 
-                               ['firefox', 'chrome', 'code', 'terminal', 'nautilus', 'gedit']):
-                            return cmd_part.split('/')[-1]
-                            
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+            cmdline = info.get('cmdline', [])
+            if cmdline:
+                # Look for common application patterns
+                for cmd_part in cmdline:
+                    if _GUI_HINTS_RE.search(cmd_part.lower()):
+                        return cmd_part.rsplit('/', 1)[-1]
             
             return name
             
@@ -113,78 +263,110 @@ class EventCollector:
     
     def _detect_new_applications(self):
         """Detect newly launched applications."""
-        current_processes = set()
         new_applications = []
         
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'create_time']):
+            # Only processes that were not running at the previous check need their details
+            current_processes = set(psutil.pids())
+            
+            for pid in sorted(current_processes - self.known_processes):  # In PID order, like process_iter()
                 try:
-                    pid = proc.info['pid']
-                    current_processes.add(pid)
+                    # as_dict() reads all attributes under a single oneshot() context
+                    info = psutil.Process(pid).as_dict(attrs=['name', 'cmdline', 'create_time'])
+                    app_name = self._get_application_name(info)
                     
-                    # Check if this is a new process
-                    if pid not in self.known_processes:
-                        app_name = self._get_application_name(proc)
+                    if app_name and app_name not in self.known_applications:
+                        # This is a new application launch
+                        create_time = datetime.fromtimestamp(info['create_time'])
                         
-                        if app_name and app_name not in self.known_applications:
-                            # This is a new application launch
-                            create_time = datetime.fromtimestamp(proc.info['create_time'])
+                        # Only log if it's recent (within last check interval + buffer)
+                        time_diff = (datetime.now() - create_time).total_seconds()
+                        if time_diff <= self.check_interval + 2:
+                            new_applications.append({
+                                'app_name': app_name,
+                                'pid': pid,
+                                'create_time': create_time,
+                                'cmdline': ' '.join(info.get('cmdline', [])[:3])  # First 3 parts only
+                            })
                             
-                            # Only log if it's recent (within last check interval + buffer)
-                            time_diff = (datetime.now() - create_time).total_seconds()
-                            if time_diff <= self.check_interval + 2:
-                                new_applications.append({
-                                    'app_name': app_name,
-                                    'pid': pid,
-                                    'create_time': create_time,
-                                    'cmdline': ' '.join(proc.info.get('cmdline', [])[:3])  # First 3 parts only
-                                })
-                                
-                                self.known_applications.add(app_name)
-                        
-                        self.known_processes.add(pid)
+                            self.known_applications.add(app_name)
                 
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    current_processes.discard(pid)  # Gone already; retried if the PID shows up again
                     continue
-                    
+            
+            # PIDs that no longer exist are dropped
+            self.known_processes = current_processes
+            
         except Exception as e:
             logging.error(f"Error detecting new applications: {e}")
         
-        # Remove PIDs that no longer exist
-        self.known_processes &= current_processes
-        
         return new_applications
     
+    def _queue_event(self, event_type: str, app_name: str = None,
+                     session_id: str = None, metadata: Dict = None):
+        """Queue an event for the writer thread instead of writing it from the caller."""
+        self._event_queue.put((event_type, app_name, session_id, metadata))
+    
+    def _write_events(self):
+        """Writer loop: commit queued events in batches until the stop sentinel (None) arrives."""
+        # The writer is the only thread that writes events, so it owns its connection
+        try:
+            conn = self.db.new_connection()
+        except Exception as e:
+            logging.error(f"Error opening event writer connection: {e}")
+            conn = None
+        
+        stopping = False
+        while not stopping:
+            batch = [self._event_queue.get()]
+            while len(batch) < _EVENT_BATCH_SIZE:
+                try:
+                    batch.append(self._event_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if None in batch:
+                stopping = True
+                batch = [event for event in batch if event is not None]
+            
+            self._store_events(batch, conn)
+        
+        if conn is not None:
+            conn.close()
+    
+    def _store_events(self, batch: list, conn=None):
+        """Store a batch of queued events in one transaction (on conn, if given)."""
+        rows = [(event_type, app_name, session_id,
+                 metadata.to_metadata() if isinstance(metadata, AppLaunchEvent) else metadata)
+                for event_type, app_name, session_id, metadata in batch]
+        try:
+            self.db.add_events_bulk(rows, conn=conn)
+        except Exception as e:
+            logging.error(f"Error writing {len(rows)} events: {e}")
+    
     def _log_session_event(self, event_type: str, metadata: Dict = None):
         """Log session-related events."""
-        self.db.add_event(
+        self._queue_event(
             event_type=event_type,
             session_id=self.session_id,
             metadata=metadata
         )
     
-    def _log_application_event(self, app_name: str, metadata: Dict = None):
+    def _log_application_event(self, app_name: str, launch: AppLaunchEvent):
         """Log application launch events."""
-        event_metadata = {
-            'session_id': self.session_id,
-            'hour_of_day': datetime.now().hour,
-            'weekday': datetime.now().weekday(),
-            'is_weekend': datetime.now().weekday() >= 5,
-            **(metadata or {})
-        }
-        
-        self.db.add_event(
+        self._queue_event(
             event_type='app_launch',
             app_name=app_name,
             session_id=self.session_id,
-            metadata=event_metadata
+            metadata=launch
         )
     
     def _check_system_activity(self):
         """Check for system activity and session changes."""
         try:
-            # Check CPU and memory usage as indicators of activity
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # Check CPU and memory usage as indicators of activity (usage since the previous reading)
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             
             # Check if system seems idle (very low CPU usage)
@@ -228,7 +410,7 @@ class EventCollector:
         """Main event collection loop."""
         logging.info("Starting event collection loop")
         
-        while self.running:
+        while not self._stop_event.is_set():
             try:
                 # Collect application events
                 current_time = time.time()
@@ -243,14 +425,11 @@ class EventCollector:
                     self._detect_request_flooding()
                     self.last_network_check = current_time
                 
-                time.sleep(0.5)  # More frequent checks
+                self._stop_event.wait(0.5)  # More frequent checks
                 
-            except KeyboardInterrupt:
-                logging.info("Event collection interrupted by user")
-                break
             except Exception as e:
                 logging.error(f"Error in event collection loop: {e}")
-                time.sleep(self.check_interval)
+                self._stop_event.wait(self.check_interval)
     
     def start(self):
         """Start the event collector in a background thread."""
@@ -259,6 +438,9 @@ class EventCollector:
             return
         
         self.running = True
+        self._stop_event.clear()
+        self.writer_thread = threading.Thread(target=self._write_events, daemon=True)
+        self.writer_thread.start()
         self.start_session()
         
         self.collector_thread = threading.Thread(target=self.collect_events, daemon=True)
@@ -273,16 +455,30 @@ class EventCollector:
         
         logging.info("Stopping event collector")
         self.running = False
+        self._stop_event.set()
         
         if self.collector_thread and self.collector_thread.is_alive():
             self.collector_thread.join(timeout=5)
         
         self.end_session()
+        
+        # Flush the queued events, session end included
+        self._event_queue.put(None)
+        if self.writer_thread and self.writer_thread.is_alive():
+            self.writer_thread.join(timeout=5)
         logging.info("Event collector stopped")
     
     def _collect_application_events(self):
         """Collect and log application launch events with enhanced sensitivity."""
         new_apps = self._detect_new_applications()
+        if not new_apps:
+            return
+        
+        # One clock and system reading per poll; cpu_percent(None) is the usage since the previous call
+        poll_now = datetime.now()
+        poll_weekday = poll_now.weekday()
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory_percent = psutil.virtual_memory().percent
         
         for app_data in new_apps:
             app_name = app_data['app_name']
@@ -297,63 +493,81 @@ class EventCollector:
             self._check_suspicious_applications(app_name)
             
             # Enhanced metadata collection
-            enhanced_metadata = {
-                'pid': app_data['pid'],
-                'cmdline': app_data['cmdline'],
-                'create_time': app_data['create_time'].isoformat(),
-                'cpu_percent': psutil.cpu_percent(interval=0.1),
-                'memory_percent': psutil.virtual_memory().percent,
-                'app_launch_count_hour': self.app_launch_counts.get(app_name, {}).get('hour', 0),
-                'app_launch_count_day': self.app_launch_counts.get(app_name, {}).get('day', 0),
-                'is_unusual_app': app_name in self.unusual_apps,
-                'is_high_frequency': app_name in self.high_frequency_apps
-            }
+            launch_counts = self.app_launch_counts.get(app_name, {})
+            launch = AppLaunchEvent(
+                session_id=self.session_id,
+                hour_of_day=poll_now.hour,
+                weekday=poll_weekday,
+                pid=app_data['pid'],
+                cmdline=app_data['cmdline'],
+                create_time=app_data['create_time'].isoformat(),
+                cpu_percent=cpu_percent,
+                memory_percent=memory_percent,
+                app_launch_count_hour=launch_counts.get('hour', 0),
+                app_launch_count_day=launch_counts.get('day', 0),
+                is_unusual_app=app_name in self.unusual_apps,
+                is_high_frequency=app_name in self.high_frequency_apps
+            )
             
-            self._log_application_event(app_name, enhanced_metadata)
+            self._log_application_event(app_name, launch)
             logging.info(f"Enhanced app launch logged: {app_name}")
+        
+        # One combination pass over the windows ending on this poll's launches
+        self._detect_unusual_patterns_batch(len(new_apps))
     
     def _collect_network_events(self):
         """Collect detailed network traffic and connection events."""
         try:
-            # Get network connections
-            connections = psutil.net_connections(kind='inet')
+            # Get established connections
+            connections = [conn for conn in psutil.net_connections(kind='inet')
+                           if conn.status == psutil.CONN_ESTABLISHED and conn.raddr]
             current_time = time.time()
             
+            # Only connections that were not open at the previous check can be new
+            active_connections = {(conn.raddr.ip, conn.raddr.port, conn.laddr.port) for conn in connections}
+            opened = [conn for conn in connections
+                      if (conn.raddr.ip, conn.raddr.port, conn.laddr.port) not in self._known_connections]
+            self._known_connections = active_connections
+            self._adapt_network_check_interval(bool(opened))
+            
             # Track new connections
-            active_connections = []
-            for conn in connections:
-                if conn.status == psutil.CONN_ESTABLISHED and conn.raddr:
-                    remote_ip = conn.raddr.ip
-                    remote_port = conn.raddr.port
-                    local_port = conn.laddr.port
+            for conn in opened:
+                remote_ip = conn.raddr.ip
+                remote_port = conn.raddr.port
+                local_port = conn.laddr.port
+                
+                connection_key = f"{remote_ip}:{remote_port}"
+                
+                # Skip endpoints already logged recently
+                if connection_key not in self._recent_connection_keys:
+                    # Log new connection
+                    self._queue_event(
+                        event_type="network_connection",
+                        app_name="system",
+                        session_id=self.session_id,
+                        metadata={
+                            'remote_ip': remote_ip,
+                            'remote_port': remote_port,
+                            'local_port': local_port,
+                            'connection_status': conn.status,
+                            'protocol': 'TCP' if conn.type == 1 else 'UDP',
+                            'is_suspicious_ip': remote_ip in self.suspicious_ips,
+                            'connection_count': len(active_connections)
+                        }
+                    )
                     
-                    connection_key = f"{remote_ip}:{remote_port}"
-                    active_connections.append(connection_key)
+                    self.connection_history.append({
+                        'key': connection_key,
+                        'timestamp': current_time,
+                        'remote_ip': remote_ip,
+                        'remote_port': remote_port
+                    })
                     
-                    # Check if this is a new connection
-                    if connection_key not in [c.get('key') for c in self.connection_history[-50:]]:
-                        # Log new connection
-                        self.db.add_event(
-                            event_type="network_connection",
-                            app_name="system",
-                            session_id=self.session_id,
-                            metadata={
-                                'remote_ip': remote_ip,
-                                'remote_port': remote_port,
-                                'local_port': local_port,
-                                'connection_status': conn.status,
-                                'protocol': 'TCP' if conn.type == 1 else 'UDP',
-                                'is_suspicious_ip': remote_ip in self.suspicious_ips,
-                                'connection_count': len(active_connections)
-                            }
-                        )
-                        
-                        self.connection_history.append({
-                            'key': connection_key,
-                            'timestamp': current_time,
-                            'remote_ip': remote_ip,
-                            'remote_port': remote_port
-                        })
+                    # Keys stay unique within the window, so the oldest key leaves it
+                    if len(self._recent_keys_order) == self._recent_keys_order.maxlen:
+                        self._recent_connection_keys.discard(self._recent_keys_order[0])
+                    self._recent_keys_order.append(connection_key)
+                    self._recent_connection_keys.add(connection_key)
             
             # Get network I/O statistics
             net_io = psutil.net_io_counters()
@@ -366,7 +580,7 @@ class EventCollector:
                 
                 # High bandwidth usage threshold (1MB/s)
                 if bytes_sent_rate > 1024*1024 or bytes_recv_rate > 1024*1024:
-                    self.db.add_event(
+                    self._queue_event(
                         event_type="high_bandwidth",
                         app_name="network",
                         session_id=self.session_id,
@@ -385,32 +599,44 @@ class EventCollector:
         except Exception as e:
             logging.error(f"Error collecting network events: {e}")
     
+    def _adapt_network_check_interval(self, saw_new_connections: bool):
+        """Back off network checks while no connections open; return to the base rate when one does."""
+        if saw_new_connections:
+            self._idle_network_checks = 0
+            self.network_check_interval = _NETWORK_CHECK_INTERVAL
+            return
+        
+        self._idle_network_checks += 1
+        if self._idle_network_checks >= _IDLE_NETWORK_CHECKS:
+            self._idle_network_checks = 0
+            self.network_check_interval = min(self.network_check_interval * 2, _MAX_NETWORK_CHECK_INTERVAL)
+    
     def _monitor_suspicious_connections(self):
         """Monitor for suspicious connection patterns."""
         try:
-            recent_connections = [c for c in self.connection_history 
-                                if time.time() - c['timestamp'] < 300]  # Last 5 minutes
+            # Last 5 minutes
+            self._drop_expired(self.connection_history, 'timestamp', time.time(), 300)
+            recent_connections = self.connection_history
             
             if len(recent_connections) > 20:  # More than 20 new connections in 5 minutes
-                self.db.add_event(
+                ip_counts = Counter(c['remote_ip'] for c in recent_connections)
+                self._queue_event(
                     event_type="connection_flooding",
                     app_name="network",
                     session_id=self.session_id,
                     metadata={
                         'connection_count': len(recent_connections),
                         'time_window': 300,
-                        'unique_ips': len(set(c['remote_ip'] for c in recent_connections)),
-                        'most_common_ip': max(set(c['remote_ip'] for c in recent_connections), 
-                                            key=lambda ip: sum(1 for c in recent_connections if c['remote_ip'] == ip))
+                        'unique_ips': len(ip_counts),
+                        'most_common_ip': ip_counts.most_common(1)[0][0]
                     }
                 )
                 logging.warning(f"Connection flooding detected: {len(recent_connections)} connections in 5 minutes")
             
             # Check for connections to suspicious ports
-            suspicious_ports = {22, 23, 135, 139, 445, 1433, 3389, 5432}  # Common attack ports
-            for conn in recent_connections[-10:]:  # Check last 10 connections
-                if conn['remote_port'] in suspicious_ports:
-                    self.db.add_event(
+            for conn in islice(recent_connections, max(len(recent_connections) - 10, 0), None):  # Check last 10 connections
+                if conn['remote_port'] in _SUSPICIOUS_PORTS:
+                    self._queue_event(
                         event_type="suspicious_port_connection",
                         app_name="network",
                         session_id=self.session_id,
@@ -431,20 +657,20 @@ class EventCollector:
             current_time = time.time()
             
             # Count recent app launches in the last minute
-            recent_launches = [a for a in self.app_launch_history 
-                             if current_time - a['time'] < 60]
+            recent_launches = list(takewhile(lambda a: current_time - a['time'] < 60,
+                                             reversed(self.app_launch_history)))[::-1]
             
             if len(recent_launches) > 15:  # More than 15 app launches per minute
-                self.db.add_event(
+                app_counts = Counter(a['app'] for a in recent_launches)
+                self._queue_event(
                     event_type="request_flooding",
                     app_name="system",
                     session_id=self.session_id,
                     metadata={
                         'launches_per_minute': len(recent_launches),
                         'threshold': 15,
-                        'unique_apps': len(set(a['app'] for a in recent_launches)),
-                        'most_launched_app': max(set(a['app'] for a in recent_launches), 
-                                               key=lambda app: sum(1 for a in recent_launches if a['app'] == app))
+                        'unique_apps': len(app_counts),
+                        'most_launched_app': app_counts.most_common(1)[0][0]
                     }
                 )
                 logging.warning(f"App launch flooding detected: {len(recent_launches)} launches in last minute")
@@ -452,6 +678,12 @@ class EventCollector:
         except Exception as e:
             logging.error(f"Error detecting request flooding: {e}")
     
+    @staticmethod
+    def _drop_expired(history: deque, time_key: str, now: float, window: float):
+        """Pop entries older than the window off the front of a time-ordered history."""
+        while history and now - history[0][time_key] >= window:
+            history.popleft()
+    
     def _track_app_launch_frequency(self, app_name):
         """Track application launch frequency for anomaly detection."""
         current_time = time.time()
@@ -477,7 +709,7 @@ class EventCollector:
         
         # Check for unusual frequency
         if app_data['hour'] > 5:  # More than 5 launches per hour (more sensitive)
-            self.db.add_event(
+            self._queue_event(
                 event_type="high_frequency_app",
                 app_name=app_name,
                 session_id=self.session_id,
@@ -491,107 +723,76 @@ class EventCollector:
             logging.warning(f"High frequency app usage: {app_name} launched {app_data['hour']} times this hour")
     
     def _detect_unusual_app_patterns(self, app_name):
-        """Detect unusual application combination patterns."""
+        """Record an app launch for the combination check run once per poll."""
         # Keep track of recent app launches
         current_time = time.time()
-        self.app_launch_history.append({'app': app_name, 'time': current_time})
+        self.app_launch_history.append({'app': app_name, 'app_lower': _normalize_app_name(app_name),
+                                        'time': current_time})
         
         # Keep only recent launches (last 10 minutes)
-        self.app_launch_history = [a for a in self.app_launch_history 
-                                 if current_time - a['time'] < 600]
-        
-        # Check for unusual combinations
-        recent_apps = [a['app'] for a in self.app_launch_history[-5:]]  # Last 5 apps
-        
-        # Suspicious patterns (more comprehensive)
-        suspicious_combinations = [
-            ['terminal', 'browser', 'file'],  # Potential data exfiltration
-            ['ssh', 'scp', 'rsync'],  # Remote file transfer
-            ['netcat', 'nmap', 'wireshark'],  # Network reconnaissance
-            ['python', 'curl', 'wget'],  # Script-based downloading
-            ['bash', 'nc', 'python'],  # Potential reverse shell
-            ['vim', 'nano', 'systemd'],  # System file editing
-        ]
-        
-        for suspicious in suspicious_combinations:
-            if len(set(sus_app for sus_app in suspicious 
-                     if any(sus_app in app.lower() for app in recent_apps))) >= 2:
-                self.db.add_event(
-                    event_type="suspicious_app_combination",
-                    app_name=app_name,
-                    session_id=self.session_id,
-                    metadata={
-                        'pattern_keywords': suspicious,
-                        'recent_apps': recent_apps,
-                        'time_window': 600,
-                        'match_count': len(set(sus_app for sus_app in suspicious 
-                                             if any(sus_app in app.lower() for app in recent_apps)))
-                    }
-                )
-                logging.warning(f"Suspicious app combination detected: {suspicious}")
+        self._drop_expired(self.app_launch_history, 'time', current_time, 600)
+    
+    def _detect_unusual_patterns_batch(self, new_count: int):
+        """Detect unusual application combinations in every 5-launch window ending on one of the new launches."""
+        history = self.app_launch_history
+        new_count = min(new_count, len(history))
+        if not new_count:
+            return
+        
+        # The new launches plus the 4 before them cover every window; keywords are
+        # found with one regex scan per app
+        recent = list(islice(history, max(len(history) - new_count - 4, 0), None))
+        keywords = [{match.group(1) for match in _COMBINATION_KEYWORD_RE.finditer(a['app_lower'])}
+                    for a in recent]
+        reported = set()  # Pattern indices already reported this poll
+        
+        for end in range(len(recent) - new_count, len(recent)):
+            start = max(end - 4, 0)
+            found = set().union(*keywords[start:end + 1])
+            
+            # Check for unusual combinations in the last 5 apps up to this launch
+            for i, suspicious in enumerate(_SUSPICIOUS_COMBINATIONS):
+                if i in reported:
+                    continue
+                match_count = len(found.intersection(suspicious))
+                if match_count >= 2:
+                    reported.add(i)
+                    self._queue_event(
+                        event_type="suspicious_app_combination",
+                        app_name=recent[end]['app'],
+                        session_id=self.session_id,
+                        metadata={
+                            'pattern_keywords': suspicious,
+                            'recent_apps': [a['app'] for a in recent[start:end + 1]],
+                            'time_window': 600,
+                            'match_count': match_count
+                        }
+                    )
+                    logging.warning(f"Suspicious app combination detected: {suspicious}")
     
     def _check_suspicious_applications(self, app_name):
         """Check if the launched application is potentially suspicious."""
-        # Expanded list of suspicious keywords
-        suspicious_keywords = [
-            # Network tools
-            'netcat', 'ncat', 'nc', 'nmap', 'masscan', 'zmap', 'wireshark', 'tcpdump',
-            # Remote access
-            'ssh', 'telnet', 'vnc', 'rdp', 'teamviewer', 'anydesk',
-            # Security tools  
-            'metasploit', 'burp', 'sqlmap', 'nikto', 'dirb', 'gobuster', 'ffuf',
-            # Password tools
-            'hashcat', 'john', 'hydra', 'medusa', 'crunch',
-            # Wireless
-            'aircrack', 'kismet', 'wifite', 'reaver',
-            # Keyloggers/malware
-            'keylog', 'rootkit', 'backdoor', 'trojan',
-            # Tor/anonymity
-            'tor', 'proxychains', 'torsocks',
-            # Privilege escalation
-            'sudo', 'su', 'pkexec', 'doas'
-        ]
-        
-        app_lower = app_name.lower()
-        
-        for keyword in suspicious_keywords:
-            if keyword in app_lower:
-                risk_level = 'critical' if keyword in ['keylog', 'rootkit', 'backdoor', 'trojan'] else \
-                           'high' if keyword in ['metasploit', 'hydra', 'aircrack'] else 'medium'
-                
-                self.db.add_event(
-                    event_type="suspicious_application",
-                    app_name=app_name,
-                    session_id=self.session_id,
-                    metadata={
-                        'suspicious_keyword': keyword,
-                        'full_app_name': app_name,
-                        'risk_level': risk_level,
-                        'category': self._categorize_suspicious_app(keyword)
-                    }
-                )
-                self.unusual_apps.add(app_name)
-                logging.warning(f"Suspicious application launched: {app_name} (keyword: {keyword}, risk: {risk_level})")
-                break
-    
-    def _categorize_suspicious_app(self, keyword):
-        """Categorize the type of suspicious application."""
-        categories = {
-            'network_recon': ['nmap', 'masscan', 'zmap', 'nikto', 'dirb'],
-            'network_tools': ['netcat', 'ncat', 'nc', 'wireshark', 'tcpdump'],
-            'remote_access': ['ssh', 'telnet', 'vnc', 'rdp'],
-            'exploit_tools': ['metasploit', 'burp', 'sqlmap'],
-            'password_attack': ['hashcat', 'john', 'hydra', 'medusa'],
-            'wireless_attack': ['aircrack', 'kismet', 'wifite'],
-            'malware': ['keylog', 'rootkit', 'backdoor', 'trojan'],
-            'anonymity': ['tor', 'proxychains', 'torsocks'],
-            'privilege_esc': ['sudo', 'su', 'pkexec']
-        }
+        # One regex scan finds all keywords in the name; the earliest-listed one is reported
+        matches = {match.group(1) for match in _SUSPICIOUS_KEYWORD_RE.finditer(_normalize_app_name(app_name))}
+        if not matches:
+            return
         
-        for category, keywords in categories.items():
-            if keyword in keywords:
-                return category
-        return 'unknown'
+        keyword = min(matches, key=_SUSPICIOUS_KEYWORD_ORDER.get)
+        risk_level = _SUSPICIOUS_RISK_LEVELS.get(keyword, 'medium')
+        
+        self._queue_event(
+            event_type="suspicious_application",
+            app_name=app_name,
+            session_id=self.session_id,
+            metadata={
+                'suspicious_keyword': keyword,
+                'full_app_name': app_name,
+                'risk_level': risk_level,
+                'category': _CATEGORY_BY_KEYWORD.get(keyword, 'unknown')
+            }
+        )
+        self.unusual_apps.add(app_name)
+        logging.warning(f"Suspicious application launched: {app_name} (keyword: {keyword}, risk: {risk_level})")
 
     def get_status(self) -> Dict:
         """Get current status of the event collector."""
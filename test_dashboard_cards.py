@@ -6,6 +6,29 @@ Tests if all dashboard cards are populating with data
 
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # Fall back to stdlib json
+    orjson = None
+
+def decode_json(response):
+    """Decode a JSON response body, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+# Per-endpoint card checks: data['data'] -> (is_populated, summary)
+CARD_HANDLERS = {
+    "/api/status": lambda d: ('status' in d, d.get('status', 'Unknown')),
+    "/api/training-status": lambda d: ('current_phase' in d,
+                                       f"{d.get('current_phase', 'Unknown')} ({d.get('total_training_events', 0)} events)"),
+    "/api/trust": lambda d: ('current_score' in d, f"Score {d.get('current_score', 0)}"),
+    "/api/anomalies": lambda d: (True, f"{len(d.get('anomalies', []))} anomalies"),  # Empty list is still populated
+    "/api/activity": lambda d: (True, f"{d.get('total_events', 0)} activities"),  # Any response structure is populated
+    "/api/learned-patterns": lambda d: (True, f"{len(d.get('patterns', []))} patterns"),  # Empty list is still populated
+}
 
 def test_dashboard_cards():
     """Test all dashboard cards to ensure they're populating correctly"""
@@ -25,52 +48,24 @@ def test_dashboard_cards():
     }
     
     all_working = True
+    session = requests.Session()  # Reuses one keep-alive connection for all cards
+    
+    def fetch(endpoint):
+        response = session.get(f"{base_url}{endpoint}", timeout=3)
+        response.raise_for_status()
+        return decode_json(response)
+    
+    # Fetch every card concurrently; results are checked in card order below
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {card_name: executor.submit(fetch, endpoint) for card_name, endpoint in cards.items()}
     
     for card_name, endpoint in cards.items():
         try:
-            response = requests.get(f"{base_url}{endpoint}", timeout=3)
-            response.raise_for_status()
-            data = response.json()
+            data = futures[card_name].result()
             
             # Check if card has meaningful data
-            is_populated = False
-            
-            if endpoint == "/api/status":
-                data_content = data.get('data', {})
-                is_populated = 'status' in data_content
-                status = data_content.get('status', 'Unknown')
-                print(f"✅ {card_name}: {status}")
-                
-            elif endpoint == "/api/training-status":
-                data_content = data.get('data', {})
-                is_populated = 'current_phase' in data_content
-                phase = data_content.get('current_phase', 'Unknown')
-                events = data_content.get('total_training_events', 0)
-                print(f"✅ {card_name}: {phase} ({events} events)")
-                
-            elif endpoint == "/api/trust":
-                data_content = data.get('data', {})
-                is_populated = 'current_score' in data_content
-                score = data_content.get('current_score', 0)
-                print(f"✅ {card_name}: Score {score}")
-                
-            elif endpoint == "/api/anomalies":
-                data_content = data.get('data', {})
-                anomalies = data_content.get('anomalies', [])
-                is_populated = True  # Empty list is still populated
-                print(f"✅ {card_name}: {len(anomalies)} anomalies")
-                
-            elif endpoint == "/api/activity":
-                data_content = data.get('data', {})
-                is_populated = True  # Any response structure is populated
-                total_events = data_content.get('total_events', 0)
-                print(f"✅ {card_name}: {total_events} activities")
-                
-            elif endpoint == "/api/learned-patterns":
-                data_content = data.get('data', {})
-                patterns = data_content.get('patterns', [])
-                is_populated = True  # Empty list is still populated
-                print(f"✅ {card_name}: {len(patterns)} patterns")
+            is_populated, summary = CARD_HANDLERS[endpoint](data.get('data', {}))
+            print(f"✅ {card_name}: {summary}")
             
             if not is_populated:
                 print(f"⚠️  {card_name}: No data structure found")
@@ -80,6 +75,8 @@ def test_dashboard_cards():
             print(f"❌ {card_name}: ERROR - {str(e)}")
             all_working = False
     
+    session.close()
+    
     print("\n" + "=" * 45)
     if all_working:
         print("🎉 ALL DASHBOARD CARDS ARE WORKING AND POPULATED!")